@@ -1,29 +1,45 @@
+import asyncio
+import os
+from functools import partial
 from datetime import datetime
 import pandas as pd
 import pytz
 import spacy
-from spacy.language import Language
-from spacy_langdetect import LanguageDetector
 from ZulipMessenger import reportError, reportStatus
 from fetchData import upload_softskill_result_on_database
 from parameters import updating_RudeSarcasm_result, classify_rude_sarcastic, \
-    process_transcripts_escalation, classify_supervisor, classify_langSwitch, classifyApologyEmpathy, \
-    classifyUnethicalSolicitation, classifyReassurance, classifyChatClosing, classifyChatOpening, \
-    create_final_DSAT_results, classify_DSAT, classifyVoiceOfCustomer, classifyOpeningLang, processing_timely_closing, \
-    calculate_row_language_percentage_spacy, classifyPersonalization, process_TimelyOpening, process_classification, \
-    process_hold_data, apply_hold_logic, process_dead_air, merge_hold_and_dead_air, aggregate_dead_air_data, \
-    categorize_hold_status
+    process_transcripts_escalation, classify_supervisor, classify_langSwitch, create_final_DSAT_results, \
+    classify_DSAT, processing_timely_closing, calculate_row_language_percentage_spacy, process_TimelyOpening, \
+    process_classification, process_hold_and_dead_air, aprocess_classification, classify_brcp_fused, \
+    classify_softskill_conduct_fused, classify_softskill_opening_closing_fused, parameter_classifier
+from resources.parameter_specs import RUDE_SARCASTIC, ESCALATION, SUPERVISOR, BRCP_FUSED, SOFTSKILL_CONDUCT_FUSED, \
+    SOFTSKILL_OPENING_CLOSING_FUSED, SOFTSKILL_TRANSCRIPT_SPECS, APOLOGY_EMPATHY, UNETHICAL_SOLICITATION, REASSURANCE, \
+    CHAT_CLOSING, CHAT_OPENING, VOICE_OF_CUSTOMER, OPENING_LANGUAGE, PERSONALIZATION, dependency_sources, \
+    preset_answers_for
+from resources.llm_client import start_llm_run, finish_llm_run
+from resources.stage_graph import Stage, CPU_STAGE, run_stage_graph
 from resources.RefiningResults import merge_all_dataframes, main_processing_pipeline
 from resources.working_with_files import merge_dataframes, validate_SOFTSKILL_dataframe, \
     REQUIRED_COLUMNS_SOFTSKILL, validate_brcp_dataframe, REQUIRED_COLUMNS_BRCP
 
+# Ask rude/sarcasm, escalation and supervisor in one Gemini call per transcript instead of three
+BRCP_FUSED_MODE = os.getenv("BRCP_FUSED_MODE", "false").lower() == "true"
+# Ask the eight transcript-level softskill parameters in two Gemini calls per transcript instead of eight
+SOFTSKILL_FUSED_MODE = os.getenv("SOFTSKILL_FUSED_MODE", "false").lower() == "true"
+
+
+def analyse_data_using_gemini_for_brcp(df, uid, date, fused=BRCP_FUSED_MODE):
+    start_llm_run()
+    if fused:
+        # Steps 1-3 in a single LLM call per transcript
+        BRCP_res_df = process_classification(classify_brcp_fused, df, BRCP_FUSED.columns, BRCP_FUSED.name)
+        RudeSarcastic_res_df, escalation_res_df, supervisor_res_df = BRCP_FUSED.split(BRCP_res_df)
+        finish_llm_run()
+        return build_brcp_output(df, RudeSarcastic_res_df, escalation_res_df, supervisor_res_df, uid, date)
 
-def analyse_data_using_gemini_for_brcp(df, uid, date):
     # Step 1: Sarcasm & Rudeness Classification
     rude_columns = ['Sarcasm_rude_behaviour', 'Sarcasm_rude_behaviour_evidence']
     RudeSarcastic_res_df = process_classification(classify_rude_sarcastic, df, rude_columns, "Rude and Sarcastic")
-    # Apply result updates
-    RudeSarcastic_res_df = RudeSarcastic_res_df.apply(updating_RudeSarcasm_result, axis=1)
 
     # Step 2: Escalation Processing
     escalation_columns = [
@@ -40,6 +56,31 @@ def analyse_data_using_gemini_for_brcp(df, uid, date):
         'Denied_for_Supervisor_call', 'denied_evidence'
     ]
     supervisor_res_df = process_classification(classify_supervisor, df, supervisor_columns, "Supervisor Connect")
+    finish_llm_run()
+
+    return build_brcp_output(df, RudeSarcastic_res_df, escalation_res_df, supervisor_res_df, uid, date)
+
+
+async def analyse_data_using_gemini_for_brcp_async(df, uid, date, fused=BRCP_FUSED_MODE):
+    """Async BRCP analysis: the three parameters are classified concurrently on the event loop."""
+    start_llm_run()
+    if fused:
+        BRCP_res_df = await aprocess_classification(BRCP_FUSED, df)
+        RudeSarcastic_res_df, escalation_res_df, supervisor_res_df = BRCP_FUSED.split(BRCP_res_df)
+    else:
+        RudeSarcastic_res_df, escalation_res_df, supervisor_res_df = await asyncio.gather(
+            aprocess_classification(RUDE_SARCASTIC, df),
+            aprocess_classification(ESCALATION, df),
+            aprocess_classification(SUPERVISOR, df))
+    await asyncio.to_thread(finish_llm_run)
+
+    return await asyncio.to_thread(build_brcp_output, df, RudeSarcastic_res_df, escalation_res_df,
+                                   supervisor_res_df, uid, date)
+
+
+def build_brcp_output(df, RudeSarcastic_res_df, escalation_res_df, supervisor_res_df, uid, date):
+    # Apply result updates
+    RudeSarcastic_res_df = RudeSarcastic_res_df.apply(updating_RudeSarcasm_result, axis=1)
 
     CRED_FINAL_OUTPUT = df[['conversation_id', 'request_id']]
     for df, name in zip([RudeSarcastic_res_df, escalation_res_df, supervisor_res_df],
@@ -87,7 +128,134 @@ def analyse_data_using_gemini_for_brcp(df, uid, date):
             return CRED_FINAL_OUTPUT
 
 
-def analyse_data_for_soft_skill(primaryInfo_df, transcript_df, transcriptChat_df, date):
+def classify_softskill_parameter(spec, transcript_df, *source_res_dfs):
+    """
+    Classifies one transcript-level softskill parameter.
+
+    Args:
+        spec (ParameterSpec): Parameter to classify.
+        transcript_df (DataFrame): Transcripts.
+        source_res_dfs (DataFrame): Results of dependency_sources(spec), in that order; rows whose answers
+            post-processing would discard are not requested at all (see SKIP_RULES).
+    """
+    presets = preset_answers_for(spec, dict(zip(dependency_sources(spec), source_res_dfs)))
+    if presets:
+        print(f"{spec.name}: skipping {len(presets)} LLM calls whose answers would be discarded")
+    return process_classification(parameter_classifier(spec, presets), transcript_df, spec.columns, spec.name)
+
+
+def classify_fused_parameters(fused_spec, classification_func, transcript_df):
+    return process_classification(classification_func, transcript_df, fused_spec.columns, fused_spec.name)
+
+
+def fused_section(fused_spec, index, fused_res_df):
+    return fused_spec.split(fused_res_df)[index]
+
+
+def softskill_parameter_stages(fused=SOFTSKILL_FUSED_MODE):
+    """
+    Stages producing the result frame of every parameter in SOFTSKILL_TRANSCRIPT_SPECS, named after the parameter.
+
+    In fused mode the eight parameters are asked in two combined prompts per transcript and the combined results are
+    split per parameter. Otherwise every parameter is its own stage, waiting only for the parameters that decide
+    which of its calls can be skipped.
+    """
+    if not fused:
+        return [Stage(spec.name, partial(classify_softskill_parameter, spec),
+                      ("transcript_df",) + dependency_sources(spec)) for spec in SOFTSKILL_TRANSCRIPT_SPECS]
+
+    stages = []
+    for fused_spec, classification_func in ((SOFTSKILL_CONDUCT_FUSED, classify_softskill_conduct_fused),
+                                            (SOFTSKILL_OPENING_CLOSING_FUSED,
+                                             classify_softskill_opening_closing_fused)):
+        stages.append(Stage(fused_spec.name, partial(classify_fused_parameters, fused_spec, classification_func),
+                            ("transcript_df",)))
+        stages.extend(Stage(spec.name, partial(fused_section, fused_spec, index), (fused_spec.name,))
+                      for index, spec in enumerate(fused_spec.sections.values()))
+    return stages
+
+
+def survey_pitch_results(ChatClosing_res_df):
+    return ChatClosing_res_df[['request_id', "Effective IVR Survey", "Effective IVR Survey Evidence"]].rename(
+        columns={'Effective IVR Survey': 'No_Survey_Pitch',
+                 'Effective IVR Survey Evidence': 'No_Survey_Pitch_Evidence'})
+
+
+def dsat_survey_ids(transcript_df):
+    """Calls with a survey point between 1 and 3 are DSAT cases; returns them and their request_ids as strings."""
+    DSAT_df = transcript_df[(transcript_df["surveypoint"] > 0) & (transcript_df["surveypoint"] <= 3)]
+    return DSAT_df, DSAT_df['request_id'].astype(str)
+
+
+def classify_dsat_results(transcript_df):
+    DSAT_df, Survey_IDS = dsat_survey_ids(transcript_df)
+
+    if DSAT_df.empty:
+        print("⚠️ No DSAT cases found. Skipping DSAT processing...")
+        DSAT_res_df = pd.DataFrame(columns=['request_id', 'Customer_Issue_Identification', 'Reason_for_DSAT',
+                                            'Suggestion_for_DSAT_Prevention'])
+    else:
+        print("🚀 Starting DSAT processing...")
+        DSAT_columns = ['Customer_Issue_Identification', 'Reason_for_DSAT', 'Suggestion_for_DSAT_Prevention']
+        DSAT_res_df = process_classification(classify_DSAT, DSAT_df, DSAT_columns, "DSAT")
+
+    # Create final DSAT results
+    return create_final_DSAT_results(transcript_df, DSAT_res_df, Survey_IDS)
+
+
+def voice_of_customer_results(voice_of_customer_res_df, transcript_df):
+    _, Survey_IDS = dsat_survey_ids(transcript_df)
+
+    # Convert request_id to string for proper mapping
+    voice_of_customer_res_df['request_id'] = voice_of_customer_res_df['request_id'].astype(str)
+
+    # Default DSAT Category as 'N/A'
+    voice_of_customer_res_df['DSAT_Category'] = 'N/A'
+
+    # Create mapping dictionary
+    voc_category_dict = voice_of_customer_res_df.set_index('request_id')['VOC_Category'].to_dict()
+
+    # Update DSAT_Category for matching request_ids
+    voice_of_customer_res_df.loc[voice_of_customer_res_df['request_id'].isin(Survey_IDS), 'DSAT_Category'] = \
+        voice_of_customer_res_df['request_id'].apply(lambda x: voc_category_dict.get(x, 'N/A'))
+
+    print("✅ DSAT & VOC Processing Done!")
+    return voice_of_customer_res_df
+
+
+def softskill_stages(fused=SOFTSKILL_FUSED_MODE):
+    """
+    The softskill stage graph over the inputs primaryInfo_df, transcript_df and transcriptChat_df.
+
+    LLM-backed stages share the process-wide rate limiter, concurrency limit and circuit breaker, so they run on
+    threads; timely closing also calls the LLM and stays there despite its embeddings. The purely CPU-bound stages
+    (language detection, hold/dead air, spaCy language share, timely opening) run in worker processes.
+    """
+    return softskill_parameter_stages(fused) + [
+        Stage("Survey", survey_pitch_results, (CHAT_CLOSING.name,)),
+        Stage("DSAT", classify_dsat_results, ("transcript_df",)),
+        Stage("Voice Of Customer DSAT", voice_of_customer_results, (VOICE_OF_CUSTOMER.name, "transcript_df")),
+        Stage("Timely Closing", partial(processing_timely_closing, timely_closing_survey_column_name="surveypoint"),
+              ("primaryInfo_df", "transcript_df", "transcriptChat_df"),
+              status="✅ Timely CLosing Parameter processing complete"),
+        Stage("Language Switch", classify_langSwitch, ("transcriptChat_df",), CPU_STAGE,
+              status="✅ Language Switch Parameter processing complete"),
+        Stage("Hold and dead air", process_hold_and_dead_air, ("primaryInfo_df", "transcriptChat_df"), CPU_STAGE,
+              status="✅ Hold and dead air Parameter processing complete"),
+        Stage("Conversation Language", calculate_row_language_percentage_spacy, ("transcript_df",), CPU_STAGE,
+              status="✅ Conversation Language Parameter processing complete"),
+        Stage("Timely Opening", process_TimelyOpening, ("transcriptChat_df",), CPU_STAGE,
+              status="✅ Timely Opening Parameter processing complete"),
+    ]
+
+
+def report_stage(stage):
+    if stage.status:
+        reportStatus(stage.status)
+
+
+def analyse_data_for_soft_skill(primaryInfo_df, transcript_df, transcriptChat_df, date, fused=SOFTSKILL_FUSED_MODE):
+    start_llm_run()
     try:
         primaryInfo_df = primaryInfo_df[['conversation_id', 'request_id', 'Time_duration_of_Call', 'surveypoint',
                                          'Total_instance_long_dead_Air', 'Total_instance_short_dead_Air',
@@ -167,128 +335,31 @@ def analyse_data_for_soft_skill(primaryInfo_df, transcript_df, transcriptChat_df
         print(error)
         reportError(error)
 
-    # Step 1: Language Switch Parameter
-    # reportStatus(f"Processing Language Switch Parameter...")
-    langSwitch_df = classify_langSwitch(transcriptChat_df)
-    reportStatus(f"✅ Language Switch Parameter processing complete")
-
-    # Step 2: Empathy and Apology
-    empathy_columns = ['Apology_result', 'Apology_evidence', 'Empathy_result', 'Empathy_evidence',
-                       'Apology_Category', 'Empathy_Category']
-
-    Empathy_apology_res_df = process_classification(classifyApologyEmpathy, transcript_df, empathy_columns,
-                                                    "Apology and Empathy")
-    # Step 3: Unethical Solicitation
-    unethical_columns = ['Unethical_Solicitation', 'Unethical_Solicitation_Evidence']
-    Unethical_Solicitation_res_df = process_classification(classifyUnethicalSolicitation, transcript_df,
-                                                           unethical_columns, "Unethical Solicitaion")
-
-    # Step 4: Reassurance Parameter
-    Reassurance_columns = ['Reassurance_result', 'Reassurance_evidence', 'Reassurance_Category']
-    Reassurance_res_df = process_classification(classifyReassurance, transcript_df, Reassurance_columns, "Reassurance")
-
-    # Step 5: Call Closing Parameter
-    ChatClosing_columns = ["Further Assistance", "Further Assistance Evidence", "Effective IVR Survey",
-                           "Effective IVR Survey Evidence", "Branding", "Branding Evidence", "Greeting",
-                           "Greeting Evidence"]
-    ChatClosing_res_df = process_classification(classifyChatClosing, transcript_df, ChatClosing_columns, "Chat Closing")
-
-    # Step 6: Call Opening Parameter
-    ChatOpening_columns = ["Greeting_the_customer", "Greeting_the_customer_evidence", "Self_introduction",
-                           "Self_introduction_evidence", "Identity_confirmation", "Identity_confirmation_evidence"]
-    ChatOpening_res_df = process_classification(classifyChatOpening, transcript_df, ChatOpening_columns, "Chat Opening")
-
-
-    # Step 7: Survey Pitch Parameter
-    Survey_res_df = ChatClosing_res_df[['request_id', "Effective IVR Survey", "Effective IVR Survey Evidence"]].rename(
-        columns={'Effective IVR Survey': 'No_Survey_Pitch',
-                 'Effective IVR Survey Evidence': 'No_Survey_Pitch_Evidence'})
-
-    # Step 8: DSAT Parameter
-    # Convert 'surveypoint' to numeric and fill NaN with 0
+    # DSAT cases are picked by survey point
     transcript_df["surveypoint"] = pd.to_numeric(transcript_df["surveypoint"], errors='coerce').fillna(0)
 
-    # Filter rows where 'Survey Results' column is less than or equal to 3
-    DSAT_df = transcript_df[(transcript_df["surveypoint"] > 0) & (transcript_df["surveypoint"] <= 3)]
-    Survey_IDS = DSAT_df['request_id'].astype(str)  # Ensure 'request_id' consistency
-
-    if DSAT_df.empty:
-        print("⚠️ No DSAT cases found. Skipping DSAT processing...")
-        DSAT_res_df = pd.DataFrame(columns=['request_id', 'Customer_Issue_Identification', 'Reason_for_DSAT',
-                                            'Suggestion_for_DSAT_Prevention'])
-    else:
-        print("🚀 Starting DSAT processing...")
-        DSAT_columns = ['Customer_Issue_Identification', 'Reason_for_DSAT', 'Suggestion_for_DSAT_Prevention']
-        DSAT_res_df = process_classification(classify_DSAT, DSAT_df, DSAT_columns, "DSAT")
-
-    # Create final DSAT results
-    final_DSAT_res_df = create_final_DSAT_results(transcript_df, DSAT_res_df, Survey_IDS)
-
-    # Step 9: Voice Of Customer Parameter
-    voice_of_customer_columns = ['VOC_Category', 'VOC_Core_Issue_Summary']
-    voice_of_customer_res_df = process_classification(classifyVoiceOfCustomer, transcript_df, voice_of_customer_columns,
-                                                      "Voice Of Customer")
-
-    # Convert request_id to string for proper mapping
-    voice_of_customer_res_df['request_id'] = voice_of_customer_res_df['request_id'].astype(str)
-
-    # Default DSAT Category as 'N/A'
-    voice_of_customer_res_df['DSAT_Category'] = 'N/A'
-
-    # Create mapping dictionary
-    voc_category_dict = voice_of_customer_res_df.set_index('request_id')['VOC_Category'].to_dict()
-
-    # Update DSAT_Category for matching request_ids
-    voice_of_customer_res_df.loc[voice_of_customer_res_df['request_id'].isin(Survey_IDS), 'DSAT_Category'] = \
-        voice_of_customer_res_df['request_id'].apply(lambda x: voc_category_dict.get(x, 'N/A'))
-
-    print("✅ DSAT & VOC Processing Done!")
-
-    # Step 10: Opening Language Parameter
-    opening_lang_columns = ['Open the call in default language', 'Open the call in default language evidence',
-                            'Open the call in default language Reason']
-    opening_lang_res_df = process_classification(classifyOpeningLang, transcript_df, opening_lang_columns,
-                                                 "Open the call in default language")
-
-    # Step 9: Timely CLosing Parameter
-    # reportStatus(f"Processing Timely CLosing Parameter...")
-    timely_closing_res_df = processing_timely_closing(primaryInfo_df, transcript_df, transcriptChat_df, "surveypoint")
-    reportStatus(f"✅ Timely CLosing Parameter processing complete")
-
-    print("✅ Timely Closing Done!")
-
-    # Step 10: Hold and dead air Parameter
-    # reportStatus(f"Processing Hold and dead air Parameter...")
-    final_hold_df = process_hold_data(transcriptChat_df)
-    final_hold_df = apply_hold_logic(final_hold_df)
-    dead_air_df = process_dead_air(primaryInfo_df, transcriptChat_df)
-    dead_air_df = aggregate_dead_air_data(dead_air_df)
-    final_hold_df = merge_hold_and_dead_air(final_hold_df, dead_air_df)
-    final_hold_df = categorize_hold_status(final_hold_df)
-    print("Hold parameter processed...")
-    reportStatus(f"✅ Hold and dead air Parameter processing complete")
-
-    # Step 11: Conversation Language Parameter
-    # reportStatus(f"Processing Conversation Language Parameter...")
-    if not Language.has_factory("language_detector"):
-        @Language.factory("language_detector")
-        def create_language_detector(nlp, name):
-            return LanguageDetector()
-    ConversationLang_df = calculate_row_language_percentage_spacy(transcript_df)
-    reportStatus(f"✅ Conversation Language Parameter processing complete")
-
-    # Step 12: Personalization Parameter
-    Personalization_columns = ['Personalization_result', 'Personalization_Evidence']
-    Personalization_res_df = process_classification(classifyPersonalization, transcript_df, Personalization_columns,
-                                                    "Personalization")
-    print("personalization done")
-    reportStatus(f"✅ Personalization Parameter processing complete")
-
-    # Step 13: Timely Opening Parameter
-    # reportStatus(f"Processing Timely Opening Parameter...")
-    timelyOpening_df = process_TimelyOpening(transcriptChat_df)
-    print("timely opening done")
-    reportStatus(f"✅ Timely Opening Parameter processing complete")
+    # Independent stages run concurrently; see softskill_stages for the graph
+    results = run_stage_graph(softskill_stages(fused), {"primaryInfo_df": primaryInfo_df,
+                                                        "transcript_df": transcript_df,
+                                                        "transcriptChat_df": transcriptChat_df},
+                              on_complete=report_stage)
+    finish_llm_run()  # All LLM-backed stages are done
+
+    langSwitch_df = results["Language Switch"]
+    Empathy_apology_res_df = results[APOLOGY_EMPATHY.name]
+    Unethical_Solicitation_res_df = results[UNETHICAL_SOLICITATION.name]
+    Reassurance_res_df = results[REASSURANCE.name]
+    ChatClosing_res_df = results[CHAT_CLOSING.name]
+    ChatOpening_res_df = results[CHAT_OPENING.name]
+    opening_lang_res_df = results[OPENING_LANGUAGE.name]
+    Personalization_res_df = results[PERSONALIZATION.name]
+    Survey_res_df = results["Survey"]
+    final_DSAT_res_df = results["DSAT"]
+    voice_of_customer_res_df = results["Voice Of Customer DSAT"]
+    timely_closing_res_df = results["Timely Closing"]
+    final_hold_df = results["Hold and dead air"]
+    ConversationLang_df = results["Conversation Language"]
+    timelyOpening_df = results["Timely Opening"]
 
     print("combing")
     CRED_FINAL_OUTPUT = langSwitch_df
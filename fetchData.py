@@ -21,6 +21,20 @@ OUTPUT_DATABASE = os.getenv("OUTPUT_DATABASE")
 max_retries = 20
 retry_delay = 5  # Seconds
 
+# Only analyse the date's request_ids that don't have a successful softskill row yet (re-triggers and late batches)
+SOFTSKILL_INCREMENTAL = os.getenv("SOFTSKILL_INCREMENTAL", "false").lower() == "true"
+
+# First column of each LLM parameter in the softskill table; a failed classification stores "Error" / "Error 500" there
+SOFTSKILL_RESULT_COLUMNS = ("Reassurance_result", "Apology_result", "Unethical_Solicitation", "Further_Assistance",
+                            "Greeting_the_customer", "Customer_Issue_Identification", "VOC_Category",
+                            "Open_the_call_in_default_language", "timely_closing_result", "Personalization_result")
+SOFTSKILL_ERROR_CONDITION = " OR ".join(f"ISNULL({column}, '') LIKE 'Error%'" for column in SOFTSKILL_RESULT_COLUMNS)
+
+
+def in_clause(values):
+    """SQL IN list for values; str() of a one-element tuple leaves a trailing comma SQL Server rejects."""
+    return str(tuple(values)).replace(",)", ")")
+
 
 def get_connection(DATABASE):
     """Establish a database connection with retries."""
@@ -174,6 +188,13 @@ def upload_softskill_result_on_database(df, date):
 
         try:
             cursor = conn.cursor()
+            # Rows stored with error results for these request_ids are replaced by the new results
+            cursor.execute(f"""
+                DELETE FROM softskill
+                WHERE CONVERT(DATE, TRY_CAST(uploaded_date AS DATETIME)) = ?
+                AND request_id IN {in_clause(df['request_id'].astype(str).unique())}
+                AND ({SOFTSKILL_ERROR_CONDITION})
+            """, date)
             insert_query = """
                 INSERT INTO softskill (
                     conversation_id, request_id, hold_request_found, hold_evidence,
@@ -241,8 +262,26 @@ def upload_softskill_result_on_database(df, date):
     return final_msg
 
 
-def fetch_data_softskill(date):
-    """Fetch softskill-related data with retries."""
+def processed_softskill_request_ids(conn, date):
+    """Returns the request_ids (as strings) stored in the softskill table for date without error results."""
+    query = f"""
+        SELECT DISTINCT request_id
+        FROM softskill WHERE CONVERT(DATE, TRY_CAST(uploaded_date AS DATETIME)) = ?
+        AND NOT ({SOFTSKILL_ERROR_CONDITION})
+    """
+    return set(pd.read_sql(query, conn, params=[date])["request_id"].astype(str))
+
+
+def fetch_data_softskill(date, incremental=SOFTSKILL_INCREMENTAL):
+    """
+    Fetch softskill-related data with retries.
+
+    Args:
+        date (str): Upload date to analyse.
+        incremental (bool): Anti-join the date's request_ids against the softskill table and only fetch the ones
+            that haven't been analysed successfully yet (rows stored with error results are analysed again). If all
+            of them have, primary_info_df is returned empty.
+    """
     for attempt in range(1, max_retries + 1):
         try:
             primary_conn = get_connection(INPUT_DATABASE)
@@ -256,15 +295,25 @@ def fetch_data_softskill(date):
             if primary_info_df.empty:
                 return None, None, None, f"No data found for date {date} in tPrimaryInfo."
 
+            if incremental:
+                processed_ids = processed_softskill_request_ids(interaction_conn, date)
+                total_ids = primary_info_df["request_id"].nunique()
+                primary_info_df = primary_info_df[~primary_info_df["request_id"].astype(str).isin(processed_ids)]
+                if primary_info_df.empty:
+                    message = f"All {total_ids} request IDs for {date} are already analysed in softskill."
+                    return primary_info_df, None, None, message
+                reportStatus(f"Incremental Softskill for {date}: {primary_info_df['request_id'].nunique()} of "
+                             f"{total_ids} request IDs not processed yet")
+
             request_ids_tuple = tuple(primary_info_df["request_id"].unique())
             conversation_id_tuple = tuple(primary_info_df["conversation_id"].unique())
 
             interaction_data_query = f"""
                 SELECT conversationid, totalholdtime, calldisconnectionby, surveypoint 
-                FROM interactiondb WHERE conversationid IN {str(conversation_id_tuple)}
+                FROM interactiondb WHERE conversationid IN {in_clause(conversation_id_tuple)}
             """
-            transcript_query = f"SELECT * FROM tTranscript WHERE request_id IN {str(request_ids_tuple)}"
-            transcriptchat_query = f"SELECT * FROM tutterances WHERE request_id IN {str(request_ids_tuple)}"
+            transcript_query = f"SELECT * FROM tTranscript WHERE request_id IN {in_clause(request_ids_tuple)}"
+            transcriptchat_query = f"SELECT * FROM tutterances WHERE request_id IN {in_clause(request_ids_tuple)}"
 
             interaction_data_df = pd.read_sql(interaction_data_query, interaction_conn)
             transcript_df = pd.read_sql(transcript_query, primary_conn)
@@ -1,16 +1,33 @@
+import os
 import time
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 import pytz
 import requests
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from ZulipMessenger import reportTranscriptGenerated, reportError, reportStatus
-from analyseData import analyse_data_using_gemini_for_brcp, analyse_data_for_soft_skill
+from analyseData import analyse_data_using_gemini_for_brcp, analyse_data_for_soft_skill, \
+    analyse_data_using_gemini_for_brcp_async
 from fetchData import fetch_data_from_database, upload_cred_result_on_database, fetch_data_softskill, \
-    is_latest_uid_present, INPUT_DATABASE, fetchInteractionRoaster_forBrcp, get_created_on_by_uid, \
-    fetchSoftskillOpsguru, fetchBrcpOpsguru, fetchInteractionOpsguru, fetchRoster, uploadOpsgurudata
+    is_latest_uid_present, INPUT_DATABASE, SOFTSKILL_INCREMENTAL, fetchInteractionRoaster_forBrcp, \
+    get_created_on_by_uid, fetchSoftskillOpsguru, fetchBrcpOpsguru, fetchInteractionOpsguru, fetchRoster, \
+    uploadOpsgurudata
+from resources.model import warm_up
 from resources.working_with_files import createDfOpsguru
 
-app = FastAPI()
+# Comma separated models to build when a worker starts ("llm", "sentence"); empty boots fast and loads on first use
+MODEL_WARM_UP = [name.strip() for name in os.getenv("MODEL_WARM_UP", "").split(",") if name.strip()]
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if MODEL_WARM_UP:
+        await run_in_threadpool(warm_up, MODEL_WARM_UP)
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 def fetch_api_result(uid: str, max_retries=100, retry_delay=5):
@@ -68,7 +85,35 @@ def generate_output_brcp(uid, created_on):
             return {"status": "Failed", "message": error_msg}
 
         final_df = analyse_data_using_gemini_for_brcp(df, uid, created_on)
+        return upload_brcp_output(final_df, uid, created_on)
+
+    except Exception as e:
+        error_msg = f"Unexpected error in generate_output_brcp: {e}"
+        reportError(error_msg)
+        return {"status": "Error", "message": str(e)}
 
+
+async def agenerate_output_brcp(uid, created_on):
+    # Same as generate_output_brcp, but the Gemini calls are awaited and blocking DB work runs in the threadpool.
+    try:
+        df = await run_in_threadpool(fetch_data_from_database, uid)
+        if df is None or df.empty:
+            error_msg = "Failed to fetch data from the database or DataFrame is empty."
+            await run_in_threadpool(reportError, error_msg)
+            return {"status": "Failed", "message": error_msg}
+
+        final_df = await analyse_data_using_gemini_for_brcp_async(df, uid, created_on)
+        return await run_in_threadpool(upload_brcp_output, final_df, uid, created_on)
+
+    except Exception as e:
+        error_msg = f"Unexpected error in agenerate_output_brcp: {e}"
+        await run_in_threadpool(reportError, error_msg)
+        return {"status": "Error", "message": str(e)}
+
+
+def upload_brcp_output(final_df, uid, created_on):
+    # Merge the analysed BRCP data with the interaction roster and upload it.
+    try:
         if final_df is None or final_df.empty:
             error_msg = "Data analysis failed. The output DataFrame is either missing or incorrect."
             reportError(error_msg)
@@ -131,7 +176,7 @@ def generate_output_brcp(uid, created_on):
             return {"status": "Uploading Failed", "message": msg}
 
     except Exception as e:
-        error_msg = f"Unexpected error in generate_output_brcp: {e}"
+        error_msg = f"Unexpected error in upload_brcp_output: {e}"
         reportError(error_msg)
         return {"status": "Error", "message": str(e)}
 
@@ -177,16 +222,16 @@ def get_brcp_result_generate_analyse_uid(uid):
 
 
 @app.post("/brcp/analyse/{uid}")
-def get_brcp_result_analyse(uid):
-    created_on = get_created_on_by_uid(INPUT_DATABASE, uid)
-    reportStatus(f"Analysing for UID {uid} created on {created_on}")
+async def get_brcp_result_analyse(uid):
+    created_on = await run_in_threadpool(get_created_on_by_uid, INPUT_DATABASE, uid)
+    await run_in_threadpool(reportStatus, f"Analysing for UID {uid} created on {created_on}")
     if uid:
-        gemini_response = generate_output_brcp(uid, created_on)
+        gemini_response = await agenerate_output_brcp(uid, created_on)
         status = {"TransmonResponse": "Already in DB", "GeminiResponse": gemini_response}
-        reportStatus(status)
+        await run_in_threadpool(reportStatus, status)
     else:
         status = {"status": "Fetching latest Upload ID Failed", "message": "Upload Id not found"}
-        reportError(status)
+        await run_in_threadpool(reportError, status)
     return status
 
 
@@ -204,13 +249,17 @@ def get_brcp_result_generate(uid):
     return status
 
 
-def generate_output_softskill(date: str):
+def generate_output_softskill(date: str, incremental: bool = SOFTSKILL_INCREMENTAL):
     responseSoftSkill = {}
     try:
-        # Fetch data
-        primaryInfo_df, transcript_df, transcriptChat_df, responseDB = fetch_data_softskill(date)
+        # Fetch data (incremental: only request_ids without a successful row in the softskill table yet)
+        primaryInfo_df, transcript_df, transcriptChat_df, responseDB = fetch_data_softskill(date, incremental)
         responseSoftSkill['responseDB'] = responseDB
 
+        if incremental and primaryInfo_df is not None and primaryInfo_df.empty:
+            reportStatus(f"✅ Softskill for {date} is up to date: {responseDB}")
+            return responseSoftSkill
+
         # Function to check if a DataFrame is invalid
         def is_invalid_df(df):
             return df is None or df.empty or (len(df) == 1 and df.columns.tolist() == df.iloc[0].tolist())
@@ -232,22 +281,22 @@ def generate_output_softskill(date: str):
 
 
 @app.get("/softskill")
-def get_softskill_result():
+def get_softskill_result(incremental: bool = SOFTSKILL_INCREMENTAL):
     ist = pytz.timezone('Asia/Kolkata')
     date = (datetime.now(ist) - timedelta(days=1)).date()
     print("req date in IST:", date)
     reportStatus(f"Starting Softskill Parameter for {date}")
-    softskill_response = generate_output_softskill(date)
+    softskill_response = generate_output_softskill(date, incremental)
     reportStatus(softskill_response)
 
     return {"database response": softskill_response}
 
 
 @app.get("/softskill/analyse/{date}")
-def get_softskill_result_by_date(date):
+def get_softskill_result_by_date(date, incremental: bool = SOFTSKILL_INCREMENTAL):
     print("req date in IST:", date)
     reportStatus(f"Starting Softskill Parameter for {date}")
-    softskill_response = generate_output_softskill(date)
+    softskill_response = generate_output_softskill(date, incremental)
     reportStatus(softskill_response)
 
     return {"database response": softskill_response}
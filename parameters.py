@@ -1,143 +1,280 @@
+import asyncio
+import hashlib
 import re
 import time
 
 import spacy
+from spacy.language import Language
+from spacy_langdetect import LanguageDetector
 import langid
 import numpy as np
 import pandas as pd
 from rapidfuzz import process, fuzz
 
 from ZulipMessenger import reportError, reportStatus
-from sentence_transformers import util
-from resources.model import llm, timely_closing_ST_model
+from resources.model import get_sentence_model, cos_sim
 from resources.phrases import phrases_to_mark_met, survey_phrases, feedback_phrases, disconnect_phrases_en, \
     disconnect_phrases_hi, verbiage_phrases, hold_phrases, no_hold_phrases, duration_patterns, thank_you_phrases
-from resources.prompts import (RudeSarcastic_prompt, escalation_prompt, Supervisor_prompt, prompt_closing, \
-                               prompt_opening, Empathy_apology_prompt, reassurance_prompt,
-                               Unethical_Solicitation_prompt,
-                               voice_of_customer_prompt, prompt_opening_lang, timely_closing_prompt,
-                               prompt_Personalization, DSAT_prompt)
-from resources.result_extractor_cleaner import extract_json_objects, clean_text
+from resources.chunking import invoke_with_chunking, ainvoke_with_chunking
+from resources.llm_dispatcher import dispatch, llm_concurrency
+from resources.checkpoint_store import checkpoint_store
+from resources.circuit_breaker import llm_breaker, CIRCUIT_MAX_PAUSE_SECONDS
+from resources.retry_policy import llm_retry_policy, classify_failure, LONG_TRANSCRIPT, UNAVAILABLE, FATAL
+from resources.parameter_specs import RUDE_SARCASTIC, ESCALATION, SUPERVISOR, APOLOGY_EMPATHY, \
+    UNETHICAL_SOLICITATION, REASSURANCE, CHAT_CLOSING, CHAT_OPENING, DSAT, VOICE_OF_CUSTOMER, OPENING_LANGUAGE, \
+    TIMELY_CLOSING, PERSONALIZATION, BRCP_FUSED, SOFTSKILL_CONDUCT_FUSED, SOFTSKILL_OPENING_CLOSING_FUSED
+from resources.result_extractor_cleaner import clean_text
 from resources.working_with_files import validateDataframes
 
-# Configure logging
-ERROR_DUE_TO_LONG_CALL_TRANSCRIPT = "500"
 
-
-def classify_rude_sarcastic(df: pd.DataFrame, request_ids=None):
-    results, errors = [], []
+def select_rows(df: pd.DataFrame, request_ids=None):
     request_id_list = set(request_ids if request_ids else df["request_id"].tolist())
+    return [row for row in df.to_dict('records') if row.get("request_id") in request_id_list]
+
+
+def classification_error(spec, row, error):
+    """Builds the error row; long-transcript and FATAL failures can't be retried, so they aren't flagged as failed."""
+    failure_class = classify_failure(error)
+    if failure_class == LONG_TRANSCRIPT:
+        return spec.error_row(row, error), False
+    if failure_class == FATAL:
+        print(f"Error processing request_id {row.get('request_id')} for {spec.name} (not retried): {error}")
+        return spec.error_row(row, error), False
+    if failure_class != UNAVAILABLE:  # Reported once per pause, not per row
+        print(f"Error processing request_id {row.get('request_id')} for {spec.name}: {error}")
+    return spec.error_row(row, error), True
+
+
+def screened_out(spec, row):
+    """True if the spec's prescreen says this transcript can be answered without the LLM."""
+    return spec.prescreen is not None and not spec.prescreen(row.get("transcript", ""))
+
+
+def preset_answer(spec, row, preset_answers):
+    """Answer known without an LLM call (pruned by a dependency or screened out), or None."""
+    if preset_answers and row.get("request_id") in preset_answers:
+        return preset_answers[row.get("request_id")]
+    if screened_out(spec, row):
+        return spec.prescreen_answer
+    return None
 
-    for row in df.to_dict('records'):  # Faster than iterrows()
+
+def report_prescreen(spec, rows):
+    if spec.prescreen is not None and rows:
+        skipped = sum(screened_out(spec, row) for row in rows)
+        print(f"{spec.name}: {skipped} of {len(rows)} transcripts answered by keyword pre-screen without an LLM call")
+
+
+def transcript_key(transcript):
+    """Hash of the transcript with case and whitespace normalised, so re-sent copies of a call group together."""
+    return hashlib.sha256(" ".join(str(transcript).split()).casefold().encode("utf-8")).hexdigest()
+
+
+def plan_rows(spec, rows, done, preset_answers):
+    """
+    Splits rows into the ones answered without an LLM call (checkpoint or preset answer) and groups of the remaining
+    rows that share a normalised transcript, so each distinct transcript is classified once.
+
+    Returns:
+        tuple: (row index -> (result row, failed), list of groups of (row index, row) to classify)
+    """
+    outcomes, groups = {}, {}
+    for index, row in enumerate(rows):
         request_id = row.get("request_id")
-        if request_id not in request_id_list:
-            continue
+        if request_id in done:
+            outcomes[index] = done[request_id], False
+        elif (answer := preset_answer(spec, row, preset_answers)) is not None:
+            outcomes[index] = spec.result_row(row, answer), False
+        else:
+            groups.setdefault(transcript_key(row.get("transcript", "")), []).append((index, row))
 
-        try:
-            transcript = row.get("transcript", "")
-            response = llm.invoke(f"{transcript}\n\n\n\n\n\n{RudeSarcastic_prompt}")
-            extracted = extract_json_objects(response.content)[0]
-
-            results.append({
-                'request_id': request_id,
-                'Sarcasm_rude_behaviour': clean_text(extracted.get('Sarcasm_rude_behaviour', 'N/A')),
-                'Sarcasm_rude_behaviour_evidence': clean_text(extracted.get('Sarcasm_rude_behaviour_evidence', 'N/A'))
-            })
-        except Exception as e:
-            errors.append(request_id)
-            results.append({'request_id': request_id, 'Sarcasm_rude_behaviour': "Error",
-                            'Sarcasm_rude_behaviour_evidence': str(e)})
+    pending = sum(map(len, groups.values()))
+    if pending > len(groups):
+        print(f"{spec.name}: {pending} transcripts to classify, {len(groups)} distinct")
+    return outcomes, list(groups.values())
 
-    return pd.DataFrame(results), errors
 
+def load_checkpoints(spec, rows):
+    """Returns (request_id -> fingerprint, request_id -> checkpointed result row) for rows."""
+    fingerprints = {row.get("request_id"): checkpoint_store.fingerprint(spec.prompt, row.get("transcript", ""))
+                    for row in rows}
+    return fingerprints, checkpoint_store.load(spec.name, fingerprints)
 
-def process_transcripts_escalation(df: pd.DataFrame, request_ids=None):
+
+def fan_out(spec, group, extracted):
+    """Result rows of every request in a group of identical transcripts, from the answer for one of them."""
+    return [(index, spec.result_row(row, extracted)) for index, row in group]
+
+
+def collect_results(rows, outcomes):
+    """outcomes maps row index -> (result row, failed)."""
     results, errors = [], []
-    request_id_list = set(request_ids if request_ids else df["request_id"].tolist())
+    for index, row in enumerate(rows):
+        result, failed = outcomes[index]
+        results.append(result)
+        if failed:
+            errors.append(row.get("request_id"))
 
-    for row in df.to_dict('records'):
-        request_id = row.get("request_id")
-        if request_id not in request_id_list:
-            continue
+    return pd.DataFrame(results), errors
+
+
+def classify_parameter(spec, df: pd.DataFrame, request_ids=None, preset_answers=None):
+    """
+    Classifies every transcript in df against one parameter's prompt.
+
+    Rows are sent to the LLM concurrently through the shared dispatcher; results come back in row order. Rows whose
+    transcripts are identical up to case and whitespace are classified once and share the answer. Each call
+    is retried according to llm_retry_policy (backoff on throttling, small budget for parse errors); transcripts
+    rejected as too long are classified in overlapping windows instead. Every successful row is checkpointed as it
+    arrives, and rows with a valid checkpoint are not sent again, so re-runs only redo what is missing. Rows with a
+    preset answer, and transcripts rejected by the spec's prescreen, get their fixed answer without an LLM call.
 
+    Args:
+        spec (ParameterSpec): Parameter to classify.
+        df (DataFrame): Rows with 'request_id' and 'transcript'.
+        request_ids (list): Only classify these request IDs (default: all rows).
+        preset_answers (dict): request_id -> answer for rows whose LLM answer would be discarded anyway.
+
+    Returns:
+        tuple: (DataFrame of results, list of request IDs that failed)
+    """
+    rows = select_rows(df, request_ids)
+    fingerprints, done = load_checkpoints(spec, rows)
+    report_prescreen(spec, rows)
+    outcomes, groups = plan_rows(spec, rows, done, preset_answers)
+
+    def classify_group(group):
         try:
-            transcript = row.get("transcript", "")
-            response = llm.invoke(f"{transcript}\n\n\n\n\n\n{escalation_prompt}")
-            extracted = extract_json_objects(response.content)[0]
-
-            results.append({
-                'request_id': request_id,
-                'escalation_results': clean_text(extracted.get('Value', 'N/A')),
-                'Issue_Identification': clean_text(extracted.get('Issue', 'N/A')),
-                'Probable_Reason_for_Escalation': clean_text(extracted.get('Reason', 'N/A')),
-                'Probable_Reason_for_Escalation_Evidence': clean_text(extracted.get('Evidence', 'N/A')),
-                'Agent_Handling_Capability': clean_text(extracted.get('Agent Handling Capability', 'N/A')),
-                'Escalation_Category': clean_text(extracted.get('Escalation Category', 'N/A')),
-                'Escalation_Keyword': clean_text(extracted.get('Escalation Keyword', 'N/A')),
-                'Short_Escalation_Reason': clean_text(extracted.get('Short Escalation Reason', 'N/A'))
-            })
+            extracted = invoke_with_chunking(group[0][1].get("transcript", ""), spec)
+            results = fan_out(spec, group, extracted)
         except Exception as e:
-            errors.append(request_id)
-            results.append({
-                'request_id': request_id,
-                'escalation_results': "Error",
-                'Issue_Identification': str(e),
-                'Probable_Reason_for_Escalation': str(e),
-                'Probable_Reason_for_Escalation_Evidence': str(e),
-                'Agent_Handling_Capability': str(e),
-                'Escalation_Category': str(e),
-                'Escalation_Keyword': str(e),
-                'Short_Escalation_Reason': str(e)
-            })
+            return {index: classification_error(spec, row, e) for index, row in group}
+        for index, result in results:
+            request_id = rows[index].get("request_id")
+            checkpoint_store.save(spec.name, request_id, fingerprints[request_id], result)
+        return {index: (result, False) for index, result in results}
+
+    for group_outcomes in dispatch(classify_group, groups):
+        outcomes.update(group_outcomes)
+    return collect_results(rows, outcomes)
+
+
+def parameter_classifier(spec, preset_answers=None):
+    """Returns a classification_func for process_classification that classifies spec with the given presets."""
+
+    def classify(df: pd.DataFrame, request_ids=None):
+        return classify_parameter(spec, df, request_ids, preset_answers)
+
+    classify.__name__ = f"classify_parameter[{spec.name}]"
+    return classify
+
+
+async def aclassify_parameter(spec, df: pd.DataFrame, request_ids=None, preset_answers=None):
+    """
+    Async counterpart of classify_parameter built on the backends' acomplete.
+
+    Calls are bounded by the shared adaptive concurrency limit (at most llm_concurrency.maximum rows are worked on
+    at once) and the shared rate limiter, so it is safe to await from a FastAPI endpoint.
+    """
+    rows = select_rows(df, request_ids)
+    fingerprints, done = await asyncio.to_thread(load_checkpoints, spec, rows)
+    report_prescreen(spec, rows)
+    outcomes, groups = plan_rows(spec, rows, done, preset_answers)
+    semaphore = asyncio.Semaphore(llm_concurrency.maximum)
+
+    async def classify_group(group):
+        async with semaphore:
+            try:
+                extracted = await ainvoke_with_chunking(group[0][1].get("transcript", ""), spec)
+                results = fan_out(spec, group, extracted)
+            except Exception as e:
+                return {index: classification_error(spec, row, e) for index, row in group}
+        for index, result in results:
+            request_id = rows[index].get("request_id")
+            await asyncio.to_thread(checkpoint_store.save, spec.name, request_id, fingerprints[request_id], result)
+        return {index: (result, False) for index, result in results}
+
+    for group_outcomes in await asyncio.gather(*(classify_group(group) for group in groups)):
+        outcomes.update(group_outcomes)
+    return collect_results(rows, outcomes)
 
-    return pd.DataFrame(results), errors
+
+def classify_rude_sarcastic(df: pd.DataFrame, request_ids=None):
+    return classify_parameter(RUDE_SARCASTIC, df, request_ids)
+
+
+def process_transcripts_escalation(df: pd.DataFrame, request_ids=None):
+    return classify_parameter(ESCALATION, df, request_ids)
 
 
 def classify_supervisor(df: pd.DataFrame, request_ids=None):
-    results, errors = [], []
-    request_id_list = set(request_ids if request_ids else df["request_id"].tolist())
+    return classify_parameter(SUPERVISOR, df, request_ids)
 
-    for row in df.to_dict('records'):
-        request_id = row.get("request_id")
-        if request_id not in request_id_list:
-            continue
 
-        try:
-            transcript = row.get("transcript", "")
-            response = llm.invoke(f"{transcript}\n\n\n\n\n\n{Supervisor_prompt}")
-            extracted = extract_json_objects(response.content)[0]
-
-            results.append({
-                'request_id': request_id,
-                'Wanted_to_connect_with_supervisor': clean_text(extracted.get('Wanted_to_connect_with_supervisor',
-                                                                              'N/A')),
-                'de_escalate': clean_text(extracted.get('de_escalate', 'N/A')),
-                'Supervisor_call_connected': clean_text(extracted.get('Supervisor_call_connected', 'N/A')),
-                'call_back_arranged_from_supervisor': clean_text(extracted.get('call_back_arranged_from_supervisor',
-                                                                               'N/A')),
-                'supervisor_evidence': clean_text(extracted.get('supervisor_evidence', 'N/A')),
-                'Denied_for_Supervisor_call': clean_text(extracted.get('Denied_for_Supervisor_call', 'N/A')),
-                'denied_evidence': clean_text(extracted.get('denied_evidence', 'N/A'))
-            })
-        except Exception as e:
-            errors.append(request_id)
-            results.append({
-                'request_id': request_id,
-                'Wanted_to_connect_with_supervisor': "Error",
-                'de_escalate': str(e),
-                'Supervisor_call_connected': str(e),
-                'call_back_arranged_from_supervisor': str(e),
-                'supervisor_evidence': str(e),
-                'Denied_for_Supervisor_call': str(e),
-                'denied_evidence': str(e)
-            })
+def classify_brcp_fused(df: pd.DataFrame, request_ids=None):
+    return classify_parameter(BRCP_FUSED, df, request_ids)
 
-    return pd.DataFrame(results), errors
 
+def patch_rows(parameter_df, rerun_res_df, columns):
+    """
+    Overwrites columns of parameter_df with the re-run results, matched on request_id, in one indexed update.
 
-def retry_classification(main_df, parameter_df, classify_func, error_ids, columns, max_retries=25):
+    Rows whose request_id isn't in rerun_res_df are left untouched, as are re-run rows with no match in
+    parameter_df.
     """
-    Retries classification for failed request IDs up to a maximum of 20 times.
+    if rerun_res_df.empty:
+        return parameter_df
+
+    updates = rerun_res_df.drop_duplicates('request_id', keep='last').set_index('request_id')[columns]
+    mask = parameter_df['request_id'].isin(updates.index)
+    parameter_df.loc[mask, columns] = updates.reindex(parameter_df.loc[mask, 'request_id']).to_numpy()
+    return parameter_df
+
+
+def pause_for_llm(name, deadline):
+    """
+    Waits out an open circuit breaker before the next retry round, reporting the pause.
+
+    Returns:
+        bool: False if the LLM is still unavailable at deadline.
+    """
+    print(f"⏸️ {name} paused: LLM unavailable")
+    reportStatus(f"⏸️ {name} paused: LLM unavailable. Retrying in {llm_breaker.retry_in():.0f}s")
+    if not llm_breaker.wait_until_available(deadline - time.monotonic()):
+        reportError(f"❌ {name}: LLM still unavailable after {CIRCUIT_MAX_PAUSE_SECONDS:.0f}s, giving up")
+        return False
+    reportStatus(f"▶️ {name} resumed: retrying the rows that failed while the LLM was unavailable")
+    return True
+
+
+async def apause_for_llm(name, deadline):
+    """Async counterpart of pause_for_llm."""
+    print(f"⏸️ {name} paused: LLM unavailable")
+    await asyncio.to_thread(reportStatus, f"⏸️ {name} paused: LLM unavailable. "
+                                          f"Retrying in {llm_breaker.retry_in():.0f}s")
+    if not await llm_breaker.await_available(deadline - time.monotonic()):
+        await asyncio.to_thread(reportError, f"❌ {name}: LLM still unavailable after "
+                                             f"{CIRCUIT_MAX_PAUSE_SECONDS:.0f}s, giving up")
+        return False
+    await asyncio.to_thread(reportStatus, f"▶️ {name} resumed: retrying the rows that failed while the LLM was "
+                                          f"unavailable")
+    return True
+
+
+def retry_failure_message(name, error_ids, attempt, gave_up):
+    """Final report for request IDs still failing once retry_classification / aretry_classification stop."""
+    failed_ids = ", ".join(map(str, error_ids))
+    reason = "while the LLM was unavailable" if gave_up else f"after {attempt} retry rounds"
+    return f"❌ {name} failed for {len(error_ids)} request IDs {reason}. Failed IDs: {failed_ids}"
+
+
+def retry_classification(main_df, parameter_df, classify_func, error_ids, columns, max_retries=3, name=None):
+    """
+    Retries classification for failed request IDs, backing off between rounds.
+
+    Individual calls are already retried by llm_retry_policy, so this only sweeps up IDs that exhausted their
+    per-call budget (e.g. during a long quota outage). While the circuit breaker is open the job pauses instead
+    (up to CIRCUIT_MAX_PAUSE_SECONDS) and resumes with the rows that are still missing; pauses don't use up rounds.
 
     Args:
         main_df (DataFrame): Original dataframe.
@@ -145,36 +282,54 @@ def retry_classification(main_df, parameter_df, classify_func, error_ids, column
         classify_func (function): Function used to classify the parameter.
         error_ids (list): List of request IDs that failed classification.
         columns (list): Expected columns in the classification result.
-        max_retries (int): Maximum number of retry attempts (default: 20).
+        max_retries (int): Maximum number of retry rounds (default: 3).
+        name (str): Parameter name for pauses and reports (default: classify_func's name).
 
     Returns:
         DataFrame: Updated parameter_df with retried values.
     """
-    attempt = 0
-    initial_error_ids = set(error_ids)  # Store initial error IDs for final reporting
+    name = name or classify_func.__name__
+    attempt, gave_up = 0, False
+    pause_deadline = time.monotonic() + CIRCUIT_MAX_PAUSE_SECONDS
 
     while error_ids and attempt < max_retries:
-        attempt += 1
-        rerun_res_df, new_error_ids = classify_func(main_df, request_ids=error_ids)
+        if llm_breaker.is_open:
+            if not pause_for_llm(name, pause_deadline):
+                gave_up = True
+                break
+        else:
+            time.sleep(llm_retry_policy.backoff(attempt))
+            attempt += 1
+        rerun_res_df, error_ids = classify_func(main_df, request_ids=error_ids)
+
+        # Update only failed request IDs in the existing dataframe
+        parameter_df = patch_rows(parameter_df, rerun_res_df, columns)
 
-        if not rerun_res_df.empty:
-            # Update only failed request IDs in the existing dataframe
-            for row in rerun_res_df.to_dict('records'):
-                request_id = row['request_id']
-                if request_id in parameter_df['request_id'].values:
-                    row_series = pd.Series(row)  # Convert row to Pandas Series
-                    parameter_df.loc[parameter_df['request_id'] == request_id, columns] = row_series[columns].values
+    # Report errors **only after all attempts are done**
+    if error_ids:
+        reportError(retry_failure_message(name, error_ids, attempt, gave_up))
+
+    return parameter_df
 
-        error_ids = new_error_ids  # Update remaining error IDs
 
-        if not new_error_ids:
-            return parameter_df  # Exit early if all errors are resolved
+async def aretry_classification(spec, main_df, parameter_df, error_ids, max_retries=3):
+    """Async counterpart of retry_classification for aclassify_parameter."""
+    attempt, gave_up = 0, False
+    pause_deadline = time.monotonic() + CIRCUIT_MAX_PAUSE_SECONDS
+
+    while error_ids and attempt < max_retries:
+        if llm_breaker.is_open:
+            if not await apause_for_llm(spec.name, pause_deadline):
+                gave_up = True
+                break
+        else:
+            await asyncio.sleep(llm_retry_policy.backoff(attempt))
+            attempt += 1
+        rerun_res_df, error_ids = await aclassify_parameter(spec, main_df, request_ids=error_ids)
+        parameter_df = patch_rows(parameter_df, rerun_res_df, spec.columns)
 
-    # Report errors **only after 20 attempts are done**
     if error_ids:
-        failed_ids = ", ".join(map(str, error_ids))
-        reportError(f"❌ {classify_func} failed after {max_retries} attempts for {len(error_ids)} request IDs. "
-                    f"Failed IDs: {failed_ids}")
+        await asyncio.to_thread(reportError, retry_failure_message(spec.name, error_ids, attempt, gave_up))
 
     return parameter_df
 
@@ -270,300 +425,27 @@ def classify_langSwitch(transcriptChat_df):
 
 
 def classifyApologyEmpathy(df: pd.DataFrame, request_ids=None):
-    results, errors = [], []
-    request_id_list = set(request_ids if request_ids else df["request_id"].tolist())
-
-    for row in df.to_dict('records'):  # Faster than iterrows()
-        request_id = row.get("request_id")
-        if request_id not in request_id_list:
-            continue
-
-        try:
-            transcript = row.get("transcript", "")
-            response = llm.invoke(f"{transcript}\n\n\n\n\n\n{Empathy_apology_prompt}")
-            extracted = extract_json_objects(response.content)[0]
-
-            results.append({
-                'request_id': request_id,
-                'Apology_result': clean_text(extracted.get('Apology', 'N/A')),
-                'Apology_evidence': clean_text(extracted.get('Apology Evidence', 'N/A')),
-                'Empathy_result': clean_text(extracted.get('Empathy', 'N/A')),
-                'Empathy_evidence': clean_text(extracted.get('Empathy Evidence', 'N/A')),
-                'Apology_Category': clean_text(extracted.get('Apology Category', 'N/A')),
-                'Empathy_Category': clean_text(extracted.get('Empathy Category', 'N/A'))
-            })
-
-        except Exception as e:
-            errors.append(request_id)
-            error_message = str(e)
-            if ERROR_DUE_TO_LONG_CALL_TRANSCRIPT in error_message:
-                results.append({
-                    'request_id': request_id,
-                    'Apology_result': "Error 500",
-                    'Apology_evidence': "An unexpected error occurred on Google's side. Your input context is too long.",
-                    'Empathy_result': "Error 500",
-                    'Empathy_evidence': "An unexpected error occurred on Google's side. Your input context is too long.",
-                    'Apology_Category': "Error 500",
-                    'Empathy_Category': "An unexpected error occurred on Google's side. Your input context is too long."
-                })
-            else:
-                print(f"Error processing request_id {request_id}: {e}")
-                results.append({
-                    'request_id': request_id,
-                    'Apology_result': "Error",
-                    'Apology_evidence': str(e),
-                    'Empathy_result': "Error",
-                    'Empathy_evidence': str(e),
-                    'Apology_Category': "Error",
-                    'Empathy_Category': str(e)
-                })
+    return classify_parameter(APOLOGY_EMPATHY, df, request_ids)
 
-    return pd.DataFrame(results), errors
 
-
-def classifyUnethicalSolicitation(df: pd.DataFrame, request_ids=None):
-    results, errors = [], []
-    request_id_list = set(request_ids if request_ids else df["request_id"].tolist())
-
-    for row in df.to_dict('records'):  # Faster than iterrows()
-        request_id = row.get("request_id")
-        if request_id not in request_id_list:
-            continue
-
-        try:
-            transcript = row.get("transcript", "")
-            response = llm.invoke(f"{transcript}\n\n\n\n\n\n{Unethical_Solicitation_prompt}")
-            extracted = extract_json_objects(response.content)[0]
-
-            results.append({
-                'request_id': request_id,
-                'Unethical_Solicitation': clean_text(extracted.get('Unethical_Solicitation', 'N/A')),
-                'Unethical_Solicitation_Evidence': clean_text(extracted.get('Unethical_Solicitation_Evidence', 'N/A'))
-            })
-
-        except Exception as e:
-            errors.append(request_id)
-            error_message = str(e)
-            if ERROR_DUE_TO_LONG_CALL_TRANSCRIPT in error_message:
-                results.append({
-                    'request_id': request_id,
-                    'Unethical_Solicitation': "Error 500",
-                    'Unethical_Solicitation_Evidence': "An unexpected error occurred on the server side.",
-                })
-            else:
-                print(f"Error processing request_id {request_id}: {e}")
-                results.append({
-                    'request_id': request_id,
-                    'Unethical_Solicitation': "Error",
-                    'Unethical_Solicitation_Evidence': str(e)
-                })
-
-    return pd.DataFrame(results), errors
+def classifyUnethicalSolicitation(df: pd.DataFrame, request_ids=None, preset_answers=None):
+    return classify_parameter(UNETHICAL_SOLICITATION, df, request_ids, preset_answers)
 
 
 def classifyReassurance(df: pd.DataFrame, request_ids=None):
-    results, errors = [], []
-    request_id_list = set(request_ids if request_ids else df["request_id"].tolist())
-
-    for row in df.to_dict('records'):  # Faster than iterrows()
-        request_id = row.get("request_id")
-        if request_id not in request_id_list:
-            continue
-
-        try:
-            transcript = row.get("transcript", "")
-            response = llm.invoke(f"{transcript}\n\n\n\n\n\n{reassurance_prompt}")
-            extracted = extract_json_objects(response.content)[0]
-
-            results.append({
-                'request_id': request_id,
-                'Reassurance_result': clean_text(extracted.get('Value', 'N/A')),
-                'Reassurance_evidence': clean_text(extracted.get('Evidence', 'N/A')),
-                'Reassurance_Category': clean_text(extracted.get('Category', 'N/A'))
-
-            })
-
-        except Exception as e:
-            errors.append(request_id)
-            error_message = str(e)
-            if ERROR_DUE_TO_LONG_CALL_TRANSCRIPT in error_message:
-                results.append({
-                    'request_id': request_id,
-                    'Reassurance_result': "Error 500",
-                    'Reassurance_evidence': "An unexpected error occurred on the server side.",
-                    'Reassurance_Category': str(e)
-                })
-            else:
-                print(f"Error processing request_id {request_id}: {e}")
-                results.append({
-                    'request_id': request_id,
-                    'Reassurance_result': "Error",
-                    'Reassurance_evidence': str(e),
-                    'Reassurance_Category': str(e)
-                })
-
-    return pd.DataFrame(results), errors
+    return classify_parameter(REASSURANCE, df, request_ids)
 
 
 def classifyChatClosing(df: pd.DataFrame, request_ids=None):
-    results, errors = [], []
-    request_id_list = set(request_ids if request_ids else df["request_id"].tolist())
-
-    for row in df.to_dict('records'):  # Faster than iterrows()
-        request_id = row.get("request_id")
-        if request_id not in request_id_list:
-            continue
-
-        try:
-            transcript = row.get("transcript", "")
-            response = llm.invoke(f"{transcript}\n\n\n\n\n\n{prompt_closing}")
-            extracted = extract_json_objects(response.content)[0]
-
-            results.append({
-                'request_id': request_id,
-                'Further Assistance': clean_text(extracted.get('Further Assistance', 'N/A')),
-                'Further Assistance Evidence': clean_text(extracted.get('Further Assistance Evidence', 'N/A')),
-                'Effective IVR Survey': clean_text(extracted.get('Effective IVR Survey', 'N/A')),
-                'Effective IVR Survey Evidence': clean_text(extracted.get('Effective IVR Survey Evidence', 'N/A')),
-                'Branding': clean_text(extracted.get('Branding', 'N/A')),
-                'Branding Evidence': clean_text(extracted.get('Branding Evidence', 'N/A')),
-                'Greeting': clean_text(extracted.get('Greeting', 'N/A')),
-                'Greeting Evidence': clean_text(extracted.get('Greeting Evidence', 'N/A'))
-            })
-
-        except Exception as e:
-            errors.append(request_id)
-            error_message = str(e)
-            if ERROR_DUE_TO_LONG_CALL_TRANSCRIPT in error_message:
-                results.append({
-                    'request_id': request_id,
-                    'Further Assistance Evidence': "An unexpected error occurred on Google's side. Your input context "
-                                                   "is too long.",
-                    'Effective IVR Survey': "Error 500",
-                    'Effective IVR Survey Evidence': "An unexpected error occurred on Google's side. Your input "
-                                                     "context is too long.",
-                    'Branding': "Error 500",
-                    'Branding Evidence': "An unexpected error occurred on Google's side. Your input context is too "
-                                         "long.",
-                    'Greeting': "Error 500",
-                    'Greeting Evidence': "An unexpected error occurred on Google's side. Your input context is too "
-                                         "long."
-
-                })
-            else:
-                print(f"Error processing request_id {request_id}: {e}")
-                results.append({
-                    'request_id': request_id,
-                    'Further Assistance': "Error",
-                    'Further Assistance Evidence': str(e),
-                    'Effective IVR Survey': "Error",
-                    'Effective IVR Survey Evidence': str(e),
-                    'Branding': "Error",
-                    'Branding Evidence': str(e),
-                    'Greeting': "Error",
-                    'Greeting Evidence': str(e)
-                })
-
-    return pd.DataFrame(results), errors
+    return classify_parameter(CHAT_CLOSING, df, request_ids)
 
 
 def classifyChatOpening(df: pd.DataFrame, request_ids=None):
-    results, errors = [], []
-    request_id_list = set(request_ids if request_ids else df["request_id"].tolist())
-
-    for row in df.to_dict('records'):  # Faster than iterrows()
-        request_id = row.get("request_id")
-        if request_id not in request_id_list:
-            continue
-
-        try:
-            transcript = row.get("transcript", "")
-            response = llm.invoke(f"{transcript}\n\n\n\n\n\n{prompt_opening}")
-            extracted = extract_json_objects(response.content)[0]
-
-            results.append({
-                'request_id': request_id,
-                'Greeting_the_customer': clean_text(extracted.get('Greeting the Customer', 'N/A')),
-                'Greeting_the_customer_evidence': clean_text(extracted.get('Greeting the Customer Evidence', 'N/A')),
-                'Self_introduction': clean_text(extracted.get('Self Introduction', 'N/A')),
-                'Self_introduction_evidence': clean_text(extracted.get('Self Introduction Evidence', 'N/A')),
-                'Identity_confirmation': clean_text(extracted.get('Customer Identity Confirmation', 'N/A')),
-                'Identity_confirmation_evidence': clean_text(
-                    extracted.get('Customer Identity Confirmation Evidence', 'N/A'))
-            })
-
-        except Exception as e:
-            errors.append(request_id)
-            error_message = str(e)
-            if ERROR_DUE_TO_LONG_CALL_TRANSCRIPT in error_message:
-                results.append({
-                    'request_id': request_id,
-                    'Greeting_the_customer': "An unexpected error occurred on Google's side. Your input context "
-                                                   "is too long.",
-                    'Greeting_the_customer_evidence': "Error 500",
-                    'Self_introduction': "An unexpected error occurred on Google's side. Your input "
-                                                     "context is too long.",
-                    'Self_introduction_evidence': "Error 500",
-                    'Identity_confirmation': "An unexpected error occurred on Google's side. Your input context is too "
-                                         "long.",
-                    'Identity_confirmation_evidence': "Error 500"
-
-                })
-            else:
-                print(f"Error processing request_id {request_id}: {e}")
-                results.append({
-                    'request_id': request_id,
-                    'Greeting_the_customer': "Error",
-                    'Greeting_the_customer_evidence': str(e),
-                    'Self_introduction': "Error",
-                    'Self_introduction_evidence': str(e),
-                    'Identity_confirmation': "Error",
-                    'Identity_confirmation_evidence': str(e)
-                })
-
-    return pd.DataFrame(results), errors
+    return classify_parameter(CHAT_OPENING, df, request_ids)
 
 
 def classify_DSAT(df: pd.DataFrame, request_ids=None):
-    results, errors = [], []
-    request_id_list = set(request_ids if request_ids else df["request_id"].tolist())
-
-    for row in df.to_dict('records'):  # Faster than iterrows()
-        request_id = row.get("request_id")
-        if request_id not in request_id_list:
-            continue
-
-        try:
-            transcript = row.get("transcript", "")
-            response = llm.invoke(f"{transcript}\n\n\n\n\n\n{DSAT_prompt}")
-            extracted = extract_json_objects(response.content)[0]
-
-            results.append({
-                'request_id': request_id,
-                'Customer_Issue_Identification': clean_text(extracted.get('Customer_Issue_Identification', 'N/A')),
-                'Reason_for_DSAT': clean_text(extracted.get('Reason_for_DSAT', 'N/A')),
-                'Suggestion_for_DSAT_Prevention': clean_text(extracted.get('Suggestion_for_DSAT_Prevention', 'N/A'))
-            })
-
-        except Exception as e:
-            errors.append(request_id)
-            error_message = str(e)
-            if ERROR_DUE_TO_LONG_CALL_TRANSCRIPT in error_message:
-                results.append({
-                    'request_id': request_id,
-                    'Customer_Issue_Identification': "Error 500",
-                    'Reason_for_DSAT': "Error",
-                    'Suggestion_for_DSAT_Prevention': str(e)})
-            else:
-                print(f"Error processing request_id {request_id}: {e}")
-                results.append({
-                    'request_id': request_id,
-                    'Customer_Issue_Identification': "Error",
-                    'Reason_for_DSAT': "Error",
-                    'Suggestion_for_DSAT_Prevention': str(e)
-                })
-
-    return pd.DataFrame(results), errors
+    return classify_parameter(DSAT, df, request_ids)
 
 
 def create_final_DSAT_results(df, DSAT_res_df, Survey_IDS):
@@ -579,132 +461,15 @@ def create_final_DSAT_results(df, DSAT_res_df, Survey_IDS):
 
 
 def classifyVoiceOfCustomer(df: pd.DataFrame, request_ids=None):
-    results, errors = [], []
-    request_id_list = set(request_ids if request_ids else df["request_id"].tolist())
-
-    for row in df.to_dict('records'):  # Faster than iterrows()
-        request_id = row.get("request_id")
-        if request_id not in request_id_list:
-            continue
-
-        try:
-            transcript = row.get("transcript", "")
-            response = llm.invoke(f"{transcript}\n\n\n\n\n\n{voice_of_customer_prompt}")
-            extracted = extract_json_objects(response.content)[0]
-
-            results.append({
-                'request_id': request_id,
-                'VOC_Category': clean_text(extracted.get('Category', 'N/A')),
-                'VOC_Core_Issue_Summary': clean_text(extracted.get('Core_Issue_Summary', 'N/A'))
-            })
-
-        except Exception as e:
-            errors.append(request_id)
-            error_message = str(e)
-            if ERROR_DUE_TO_LONG_CALL_TRANSCRIPT in error_message:
-                results.append({
-                    'request_id': request_id,
-                    'VOC_Category': "Error 500",
-                    'VOC_Core_Issue_Summary': "An unexpected error occurred on Google's side. Your input context is too long."
-                })
-            else:
-                print(f"Error processing request_id {request_id}: {e}")
-                results.append({
-                    'request_id': request_id,
-                    'VOC_Category': "Error",
-                    'VOC_Core_Issue_Summary': str(e)
-                })
-
-    return pd.DataFrame(results), errors
+    return classify_parameter(VOICE_OF_CUSTOMER, df, request_ids)
 
 
 def classifyOpeningLang(df: pd.DataFrame, request_ids=None):
-    results, errors = [], []
-    request_id_list = set(request_ids if request_ids else df["request_id"].tolist())
-
-    for row in df.to_dict('records'):  # Faster than iterrows()
-        request_id = row.get("request_id")
-        if request_id not in request_id_list:
-            continue
-
-        try:
-            transcript = row.get("transcript", "")
-            response = llm.invoke(f"{transcript}\n\n\n\n\n\n{prompt_opening_lang}")
-            extracted = extract_json_objects(response.content)[0]
-
-            results.append({
-                'request_id': request_id,
-                'Open the call in default language': clean_text(extracted.get('default_opening_lang', 'N/A')),
-                'Open the call in default language evidence': clean_text(extracted.get('Evidence', 'N/A')),
-                'Open the call in default language Reason': clean_text(extracted.get('Reason', 'N/A'))
-            })
-
-        except Exception as e:
-            errors.append(request_id)
-            error_message = str(e)
-            if ERROR_DUE_TO_LONG_CALL_TRANSCRIPT in error_message:
-                results.append({
-                    'request_id': request_id,
-                    'Open the call in default language': "Error 500",
-                    'Open the call in default language evidence': str(error_message),
-                    'Open the call in default language Reason': "Error"
-                })
-            else:
-                print(f"Error processing request_id {request_id}: {e}")
-                results.append({
-                    'request_id': request_id,
-                    'Open the call in default language': "Error",
-                    'Open the call in default language evidence': str(error_message),
-                    'Open the call in default language evidence Reason': "Error"
-                })
-
-    return pd.DataFrame(results), errors
+    return classify_parameter(OPENING_LANGUAGE, df, request_ids)
 
 
 def classifyTimelyClosing(df: pd.DataFrame, request_ids=None):
-    results, errors = [], []
-    request_id_list = set(request_ids if request_ids else df["request_id"].tolist())
-
-    for row in df.to_dict('records'):  # Faster than iterrows()
-        request_id = row.get("request_id")
-        if request_id not in request_id_list:
-            continue
-
-        try:
-            transcript = row.get("transcript", "")
-            response = llm.invoke(f"{transcript}\n\n\n\n\n\n{timely_closing_prompt}")
-            extracted = extract_json_objects(response.content)[0]
-
-            results.append({
-                'request_id': request_id,
-                'transcript': transcript,
-                'Category': clean_text(extracted.get('Category', 'N/A')),
-                'Summary': clean_text(extracted.get('Summary', 'N/A')),
-                'Supporting_Evidence': clean_text(extracted.get('Supporting_Evidence', 'N/A'))
-            })
-
-        except Exception as e:
-            errors.append(request_id)
-            error_message = str(e)
-            if ERROR_DUE_TO_LONG_CALL_TRANSCRIPT in error_message:
-                results.append({
-                    'request_id': request_id,
-                    'transcript': transcript,
-                    'Category': "Error",
-                    'Summary': "Server Error",
-                    'Supporting_Evidence': "Error"
-                })
-            else:
-                print(f"Error processing request_id {request_id}: {e}")
-                results.append({
-                    'request_id': request_id,
-                    'transcript': transcript,
-                    'Category': "Error",
-                    'Summary': str(e),
-                    'Supporting_Evidence': "Error"
-                })
-
-    return pd.DataFrame(results), errors
+    return classify_parameter(TIMELY_CLOSING, df, request_ids)
 
 
 def evaluate_verbiage(time_diff, threshold):
@@ -741,22 +506,23 @@ def processing_timely_closing(timely_closing_primary_info, timely_closing_transc
         return timely_closing_res_df
     else:
         print("Processing calls that were not pitched...")
-        timely_closing_transcript['request_id'] = timely_closing_transcript['request_id'].astype(str)
+        timely_closing_transcript = timely_closing_transcript.assign(
+            request_id=timely_closing_transcript['request_id'].astype(str))
         call_ended_abruptly_ids = [str(call_ended_abruptly_id) for call_ended_abruptly_id in call_ended_abruptly_ids]
         timely_closing_transcript_new = timely_closing_transcript[
             timely_closing_transcript['request_id'].isin(call_ended_abruptly_ids)]
         # Encode the phrases
-        survey_embeddings = timely_closing_ST_model.encode(survey_phrases, convert_to_tensor=True)
-        feedback_embeddings = timely_closing_ST_model.encode(feedback_phrases, convert_to_tensor=True)
+        survey_embeddings = get_sentence_model().encode(survey_phrases, convert_to_tensor=True)
+        feedback_embeddings = get_sentence_model().encode(feedback_phrases, convert_to_tensor=True)
 
         # Function to find matching phrases based on cosine similarity
         def find_matching_phrases(text, phrase_embeddings, threshold=0.7):
             text_sentences = text.split(". ")
-            text_embeddings = timely_closing_ST_model.encode(text_sentences, convert_to_tensor=True)
+            text_embeddings = get_sentence_model().encode(text_sentences, convert_to_tensor=True)
             matching_phrases = False
             for sentence_embedding in text_embeddings:
                 # Compute cosine similarity between the sentence and all phrases
-                similarities = util.pytorch_cos_sim(sentence_embedding, phrase_embeddings)
+                similarities = cos_sim(sentence_embedding, phrase_embeddings)
                 # Get the maximum similarity score for this sentence
                 max_similarity = similarities.max().item()
                 if max_similarity > threshold:
@@ -813,12 +579,12 @@ def processing_timely_closing(timely_closing_primary_info, timely_closing_transc
 
         # Define the phrases to check against
         reference_phrases = ['The customer agreed to give feedback', 'Incomplete feedback request', ' [N/A]']
-        reference_embeddings = timely_closing_ST_model.encode(reference_phrases, convert_to_tensor=True)
+        reference_embeddings = get_sentence_model().encode(reference_phrases, convert_to_tensor=True)
 
         # Function to check if the category matches any reference phrase with a threshold of 0.9
         def matches_reference_category(category):
-            category_embedding = timely_closing_ST_model.encode(category)
-            cosine_scores = util.pytorch_cos_sim(category_embedding, reference_embeddings)
+            category_embedding = get_sentence_model().encode(category)
+            cosine_scores = cos_sim(category_embedding, reference_embeddings)
             return cosine_scores.max().item() > 0.9  # Using threshold of 0.9
 
         if timely_closing_res_df.empty:
@@ -854,12 +620,12 @@ def processing_timely_closing(timely_closing_primary_info, timely_closing_transc
 
                 # Define function to check for evidence phrase in transcript
                 def check_phrases_in_transcript(trans_rows, evidence_start_times, evidence_transcript, threshold=0.8):
-                    evidence_embedding = timely_closing_ST_model.encode(evidence_transcript, convert_to_tensor=True)
+                    evidence_embedding = get_sentence_model().encode(evidence_transcript, convert_to_tensor=True)
                     for r in range(len(trans_rows)):
                         # Encode each transcript row
-                        transcript_embedding = timely_closing_ST_model.encode(trans_rows[r], convert_to_tensor=True)
+                        transcript_embedding = get_sentence_model().encode(trans_rows[r], convert_to_tensor=True)
                         # Compute cosine similarity
-                        similarity = util.pytorch_cos_sim(evidence_embedding, transcript_embedding)
+                        similarity = cos_sim(evidence_embedding, transcript_embedding)
                         if similarity.item() >= threshold:
                             return {
                                 'matched_string': trans_rows[r],
@@ -895,9 +661,9 @@ def processing_timely_closing(timely_closing_primary_info, timely_closing_transc
                     else:
                         print(f"ID {request_id}: Missing required columns in transcript data.")
                 # Encode disconnect phrases
-                embedding_disconnect_en = [timely_closing_ST_model.encode(phrase, convert_to_tensor=True) for phrase in
+                embedding_disconnect_en = [get_sentence_model().encode(phrase, convert_to_tensor=True) for phrase in
                                            disconnect_phrases_en]
-                embedding_disconnect_hi = [timely_closing_ST_model.encode(phrase, convert_to_tensor=True) for phrase in
+                embedding_disconnect_hi = [get_sentence_model().encode(phrase, convert_to_tensor=True) for phrase in
                                            disconnect_phrases_hi]
                 print("Fetching details when agent asked the customer to disconnect the call...")
 
@@ -915,12 +681,12 @@ def processing_timely_closing(timely_closing_primary_info, timely_closing_transc
                             embedding_text = model.encode(combined_text, convert_to_tensor=True)
                             # Check against English phrases
                             for embedding_disconnect in embedding_disconnect_en_phrase:
-                                similarity = util.pytorch_cos_sim(embedding_text, embedding_disconnect)
+                                similarity = cos_sim(embedding_text, embedding_disconnect)
                                 if similarity.item() >= threshold:
                                     return {'found': f'{combined_text}', 'time': combined_start_time}
                             # Check against Hindi phrases
                             for embedding_disconnect in embedding_disconnect_hi_phrase:
-                                similarity = util.pytorch_cos_sim(embedding_text, embedding_disconnect)
+                                similarity = cos_sim(embedding_text, embedding_disconnect)
                                 if similarity.item() >= threshold:
                                     return {'found': f'{combined_text}', 'time': combined_start_time}
                     return {'found': None, 'time': None}
@@ -942,7 +708,7 @@ def processing_timely_closing(timely_closing_primary_info, timely_closing_transc
                         if transcript_rows:
                             # Check for disconnect phrases after the given start time
                             result = check_disconnect_phrases(transcript_rows, start_times, embedding_disconnect_en,
-                                                              embedding_disconnect_hi, timely_closing_ST_model,
+                                                              embedding_disconnect_hi, get_sentence_model(),
                                                               starttime)
                             if result['found']:
                                 timely_closing_res_df.at[index, 'disconnect_phrase_found'] = result['found']
@@ -1007,10 +773,10 @@ def processing_timely_closing(timely_closing_primary_info, timely_closing_transc
 
                     def is_similar(phrase, transcript_phrase, threshold=0.7):
                         # Encode both phrases
-                        embeddings1 = timely_closing_ST_model.encode(phrase, convert_to_tensor=True)
-                        embeddings2 = timely_closing_ST_model.encode(transcript_phrase, convert_to_tensor=True)
+                        embeddings1 = get_sentence_model().encode(phrase, convert_to_tensor=True)
+                        embeddings2 = get_sentence_model().encode(transcript_phrase, convert_to_tensor=True)
                         # Calculate cosine similarity
-                        cosine_scores = util.pytorch_cos_sim(embeddings1, embeddings2)
+                        cosine_scores = cos_sim(embeddings1, embeddings2)
                         # Return True if similarity score is greater than the threshold
                         return cosine_scores.item() > threshold
 
@@ -1316,7 +1082,15 @@ def categorize_hold(row):
     return "Hold Guidelines Followed"
 
 
+def create_language_detector(nlp, name):
+    return LanguageDetector()
+
+
 def create_spacy_pipeline():
+    # Registered here rather than at import so it also happens in stage worker processes
+    if not Language.has_factory("language_detector"):
+        Language.factory("language_detector", func=create_language_detector)
+
     # Load the spaCy model
     nlp = spacy.load("en_core_web_sm")
 
@@ -1381,42 +1155,15 @@ def calculate_row_language_percentage_spacy(df):
 
 
 def classifyPersonalization(df: pd.DataFrame, request_ids=None):
-    results, errors = [], []
-    request_id_list = set(request_ids if request_ids else df["request_id"].tolist())
+    return classify_parameter(PERSONALIZATION, df, request_ids)
 
-    for row in df.to_dict('records'):  # Faster than iterrows()
-        request_id = row.get("request_id")
-        if request_id not in request_id_list:
-            continue
 
-        try:
-            transcript = row.get("transcript", "")
-            response = llm.invoke(f"{transcript}\n\n\n\n\n\n{prompt_Personalization}")
-            extracted = extract_json_objects(response.content)[0]
-
-            results.append({
-                'request_id': request_id,
-                'Personalization_result': clean_text(extracted.get('Personalization_result', 'N/A')),
-                'Personalization_Evidence': clean_text(extracted.get('Personalization_Evidence', 'N/A'))
-            })
+def classify_softskill_conduct_fused(df: pd.DataFrame, request_ids=None):
+    return classify_parameter(SOFTSKILL_CONDUCT_FUSED, df, request_ids)
 
-        except Exception as e:
-            errors.append(request_id)
-            error_message = str(e)
-            if ERROR_DUE_TO_LONG_CALL_TRANSCRIPT in error_message:
-                results.append({
-                    'request_id': request_id,
-                    'Personalization_result': "Error 500",
-                    'Personalization_Evidence': str(e)})
-            else:
-                print(f"Error processing request_id {request_id}: {e}")
-                results.append({
-                    'request_id': request_id,
-                    'Personalization_result': "Error",
-                    'Personalization_Evidence': str(e)
-                })
 
-    return pd.DataFrame(results), errors
+def classify_softskill_opening_closing_fused(df: pd.DataFrame, request_ids=None):
+    return classify_parameter(SOFTSKILL_OPENING_CLOSING_FUSED, df, request_ids)
 
 
 def process_TimelyOpening(dataframe):
@@ -1445,15 +1192,53 @@ def process_TimelyOpening(dataframe):
     return first_rows[['request_id', 'Delayed call opening', 'Delayed call opening evidence']]
 
 
-def process_classification(classification_func, df, expected_columns, classification_name):
-    max_retries = 5
-    retry_delay = 5
+def check_classification_pass(res_df, expected_columns, classification_name, attempt, max_passes):
+    """
+    Validates the output of one process_classification pass, dropping extra columns.
+
+    Returns:
+        tuple: (validated DataFrame or None, error to report or None). Both None means another pass should run.
+    """
+    # If classification completely fails, retry the entire DataFrame
+    if res_df is None:
+        print(f"⚠️ Attempt {attempt} failed: No valid output. Re-running rows without a checkpointed result...")
+        if attempt == max_passes:
+            return None, f"❌ Max retries reached for {classification_name} classification. No valid output received."
+        return None, None
+
+    # Validate Output
+    is_valid, missing_cols, extra_cols = validateDataframes(res_df, expected_columns + ["request_id"])
+
+    # Drop extra columns if any
+    if extra_cols:
+        print(f"⚠️ Dropping extra columns: {extra_cols}")
+        res_df = res_df.drop(columns=extra_cols, errors="ignore")
+
+    # If output is valid, break the retry loop
+    if is_valid:
+        print(f"✅ {classification_name} processing complete")
+        return res_df, None
+
+    print(f"⚠️ Attempt {attempt} failed: Missing columns [{missing_cols}] detected. "
+          f"Re-running rows without a checkpointed result...")
+
+    # If max retries are reached, log error and return None
+    if attempt == max_passes:
+        return None, (f"❌ Max retries reached for {classification_name} classification. Issues:\n"
+                      f"- Missing Columns: {missing_cols}")
+    return None, None
+
+
+def process_classification(classification_func, df, expected_columns, classification_name, max_passes=5):
     """
     Handles classification with retries, validation, and error handling.
+
+    Each pass classifies every row (rows with a checkpointed result aren't sent again), retries the failed request
+    IDs (retry_classification) and validates the output; a pass with missing columns is followed by another after a
+    backoff.
     """
-    for attempt in range(1, max_retries + 1):
+    for attempt in range(1, max_passes + 1):
         print(f"Attempt {attempt}: Processing {classification_name}...")
-        # reportStatus(f"Attempt {attempt}: Processing {classification_name}...")
 
         # Perform classification
         res_df, error_ids = classification_func(df)
@@ -1462,41 +1247,54 @@ def process_classification(classification_func, df, expected_columns, classifica
         if error_ids:
             print(f"⚠️ Retrying classification for failed request IDs...")
             reportStatus(f"⚠️ Retrying classification for failed request IDs...")
-            res_df = retry_classification(df, res_df, classification_func, error_ids, expected_columns)
-
-        # If classification completely fails, retry the entire DataFrame
-        if res_df is None:
-            print(f"⚠️ Attempt {attempt} failed: No valid output. Retrying entire DataFrame...")
-            if attempt == max_retries:
-                reportError(
-                    f"❌ Max retries reached for {classification_name} classification. No valid output received.")
-                return None
-            time.sleep(retry_delay)
-            continue
-
-        # Validate Output
-        is_valid, missing_cols, extra_cols = validateDataframes(res_df, expected_columns + ["request_id"])
+            res_df = retry_classification(df, res_df, classification_func, error_ids, expected_columns,
+                                          name=classification_name)
 
-        # Drop extra columns if any
-        if extra_cols:
-            print(f"⚠️ Dropping extra columns: {extra_cols}")
-            res_df = res_df.drop(columns=extra_cols, errors="ignore")
-
-        # If output is valid, break the retry loop
-        if is_valid:
-            print(f"✅ {classification_name} processing complete")
+        res_df, error = check_classification_pass(res_df, expected_columns, classification_name, attempt, max_passes)
+        if res_df is not None:
             reportStatus(f"✅ {classification_name} processing complete")
             return res_df
+        if error is not None:
+            reportError(error)
+            return None
 
-        print(f"⚠️ Attempt {attempt} failed: Missing columns [{missing_cols}] detected. Retrying entire DataFrame...")
+        time.sleep(llm_retry_policy.backoff(attempt))
 
-        # If max retries are reached, log error and return None
-        if attempt == max_retries:
-            reportError(f"❌ Max retries reached for {classification_name} classification. Issues:\n"
-                        f"- Missing Columns: {missing_cols}")
+
+async def aprocess_classification(spec, df, max_passes=5):
+    """
+    Async counterpart of process_classification for callers running inside an event loop (e.g. FastAPI).
+
+    Runs the same passes, retry rounds and validation, with backoffs and circuit breaker pauses that don't block the
+    loop.
+    """
+    for attempt in range(1, max_passes + 1):
+        print(f"Attempt {attempt}: Processing {spec.name}...")
+
+        res_df, error_ids = await aclassify_parameter(spec, df)
+
+        if error_ids:
+            print(f"⚠️ Retrying classification for failed request IDs...")
+            await asyncio.to_thread(reportStatus, f"⚠️ Retrying classification for failed request IDs...")
+            res_df = await aretry_classification(spec, df, res_df, error_ids)
+
+        res_df, error = check_classification_pass(res_df, spec.columns, spec.name, attempt, max_passes)
+        if res_df is not None:
+            await asyncio.to_thread(reportStatus, f"✅ {spec.name} processing complete")
+            return res_df
+        if error is not None:
+            await asyncio.to_thread(reportError, error)
             return None
 
-        time.sleep(retry_delay)
+        await asyncio.sleep(llm_retry_policy.backoff(attempt))
+
+
+def process_hold_and_dead_air(primaryInfo_df, transcriptChat_df):
+    """Hold and dead air parameter: hold requests/durations merged with dead air instances and categorised."""
+    final_hold_df = apply_hold_logic(process_hold_data(transcriptChat_df))
+    dead_air_df = aggregate_dead_air_data(process_dead_air(primaryInfo_df, transcriptChat_df))
+    final_hold_df = merge_hold_and_dead_air(final_hold_df, dead_air_df)
+    return categorize_hold_status(final_hold_df)
 
 
 def process_hold_data(transcriptChat_df):
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CHECKPOINT_ENABLED = os.getenv("CHECKPOINT_ENABLED", "true").lower() == "true"
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", "classification_checkpoints.sqlite3")
+CHECKPOINT_RETENTION_DAYS = int(os.getenv("CHECKPOINT_RETENTION_DAYS", "7"))
+
+LOOKUP_BATCH_SIZE = 500  # Stay well below SQLite's bound-parameter limit
+
+
+class CheckpointStore:
+    """
+    Persists each successful classification result row as soon as it arrives, keyed by parameter and request_id.
+
+    A checkpoint also records a fingerprint of the prompt and transcript, so it is only reused for the exact same
+    question; a changed prompt or a re-uploaded transcript is classified again. Retries and restarted runs therefore
+    only redo the rows that have no valid result yet.
+    """
+
+    def __init__(self, path, enabled=True, retention_days=CHECKPOINT_RETENTION_DAYS):
+        self.path = path
+        self.enabled = enabled
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._conn = None
+
+    @staticmethod
+    def fingerprint(prompt, transcript):
+        digest = hashlib.sha256()
+        for part in (prompt, transcript):
+            digest.update(str(part).encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS checkpoints "
+                               "(parameter TEXT NOT NULL, request_id TEXT NOT NULL, fingerprint TEXT NOT NULL, "
+                               "result TEXT NOT NULL, saved_at REAL NOT NULL, PRIMARY KEY (parameter, request_id))")
+            # Old runs are never resumed, drop them on startup
+            self._conn.execute("DELETE FROM checkpoints WHERE saved_at < ?",
+                               (time.time() - self.retention_days * 86400,))
+            self._conn.commit()
+        return self._conn
+
+    def load(self, parameter, fingerprints):
+        """
+        Returns the checkpointed result rows for one parameter.
+
+        Args:
+            parameter (str): Parameter name.
+            fingerprints (dict): request_id -> fingerprint of the current prompt and transcript.
+
+        Returns:
+            dict: request_id -> result row, for checkpoints whose fingerprint still matches.
+        """
+        if not self.enabled or not fingerprints:
+            return {}
+
+        by_key = {str(request_id): request_id for request_id in fingerprints}
+        keys = list(by_key)
+        found = {}
+        with self._lock:
+            conn = self._connection()
+            for start in range(0, len(keys), LOOKUP_BATCH_SIZE):
+                batch = keys[start:start + LOOKUP_BATCH_SIZE]
+                placeholders = ", ".join("?" * len(batch))
+                rows = conn.execute(f"SELECT request_id, fingerprint, result FROM checkpoints "
+                                    f"WHERE parameter = ? AND request_id IN ({placeholders})", [parameter] + batch)
+                for key, fingerprint, result in rows:
+                    request_id = by_key[key]
+                    if fingerprint == fingerprints[request_id]:
+                        found[request_id] = {**json.loads(result), 'request_id': request_id}
+        return found
+
+    def save(self, parameter, request_id, fingerprint, result):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            conn = self._connection()
+            conn.execute("INSERT OR REPLACE INTO checkpoints (parameter, request_id, fingerprint, result, saved_at) "
+                         "VALUES (?, ?, ?, ?, ?)",
+                         (parameter, str(request_id), fingerprint, json.dumps(result, ensure_ascii=False, default=str),
+                          time.time()))
+            conn.commit()
+
+    def clear(self, parameter=None):
+        with self._lock:
+            conn = self._connection()
+            if parameter is None:
+                conn.execute("DELETE FROM checkpoints")
+            else:
+                conn.execute("DELETE FROM checkpoints WHERE parameter = ?", (parameter,))
+            conn.commit()
+
+
+checkpoint_store = CheckpointStore(CHECKPOINT_PATH, enabled=CHECKPOINT_ENABLED)
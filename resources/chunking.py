@@ -0,0 +1,115 @@
+import os
+import re
+
+from dotenv import load_dotenv
+
+from resources.llm_client import invoke_json, ainvoke_json, estimate_tokens, route_transcript
+from resources.model import CHUNKED_ROUTE
+from resources.retry_policy import llm_retry_policy, classify_failure, LONG_TRANSCRIPT
+
+load_dotenv()
+
+# Size of each window sent to the LLM, and how much of the previous window is repeated at the start of the next
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "8000"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "500"))
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.?!।])\s+")
+
+
+def split_utterances(transcript):
+    """Splits a transcript into utterances (lines), falling back to sentences for single-line transcripts."""
+    utterances = [line for line in transcript.splitlines() if line.strip()]
+    if len(utterances) <= 1:
+        utterances = [part for part in SENTENCE_BOUNDARY.split(transcript) if part.strip()]
+    return utterances
+
+
+def hard_split(utterance, max_tokens):
+    """Cuts a single utterance that is larger than a whole window into window-sized pieces."""
+    size = max_tokens * 4
+    return [utterance[start:start + size] for start in range(0, len(utterance), size)]
+
+
+def chunk_transcript(transcript, max_tokens=CHUNK_MAX_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    """
+    Splits a transcript on utterance boundaries into overlapping windows of at most ~max_tokens tokens.
+
+    Each window after the first starts with the trailing utterances of the previous one (up to overlap_tokens), so
+    an exchange cut at a window boundary is still seen whole by one of the windows.
+
+    Returns:
+        list: Window transcripts, in order.
+    """
+    utterances = []
+    for utterance in split_utterances(transcript):
+        if estimate_tokens(utterance) > max_tokens:
+            utterances.extend(hard_split(utterance, max_tokens))
+        else:
+            utterances.append(utterance)
+
+    windows, current, current_tokens = [], [], 0
+    for utterance in utterances:
+        tokens = estimate_tokens(utterance)
+        if current and current_tokens + tokens > max_tokens:
+            windows.append("\n".join(current))
+            overlap, overlap_size = [], 0
+            for previous in reversed(current):
+                previous_tokens = estimate_tokens(previous)
+                size = overlap_size + previous_tokens
+                if size > overlap_tokens or size + tokens > max_tokens:
+                    break
+                overlap.insert(0, previous)
+                overlap_size += previous_tokens
+            current, current_tokens = overlap, overlap_size
+        current.append(utterance)
+        current_tokens += tokens
+
+    if current:
+        windows.append("\n".join(current))
+    return windows
+
+
+def transcript_windows(transcript):
+    # A transcript that fits in one window but was still rejected is split in at least two
+    return chunk_transcript(transcript, max_tokens=min(CHUNK_MAX_TOKENS, estimate_tokens(transcript) // 2 + 1))
+
+
+def invoke_chunked(transcript, spec):
+    """Map-reduce classification: asks spec's prompt for every window and merges the answers."""
+    answers = [llm_retry_policy.call(invoke_json, window, spec) for window in transcript_windows(transcript)]
+    return spec.merge_answers(answers)
+
+
+async def ainvoke_chunked(transcript, spec):
+    answers = [await llm_retry_policy.acall(ainvoke_json, window, spec) for window in transcript_windows(transcript)]
+    return spec.merge_answers(answers)
+
+
+def invoke_with_chunking(transcript, spec):
+    """
+    Classifies a transcript, using the chunked path when it is too big for every model in the routing table or when
+    Gemini rejects it as too long anyway.
+
+    Other failures are retried per llm_retry_policy and re-raised once the budget is spent.
+    """
+    if route_transcript(transcript, spec) == CHUNKED_ROUTE:
+        return invoke_chunked(transcript, spec)
+    try:
+        return llm_retry_policy.call(invoke_json, transcript, spec)
+    except Exception as e:
+        if classify_failure(e) != LONG_TRANSCRIPT:
+            raise
+    print(f"Transcript too long for {spec.name}; classifying it in windows")
+    return invoke_chunked(transcript, spec)
+
+
+async def ainvoke_with_chunking(transcript, spec):
+    if route_transcript(transcript, spec) == CHUNKED_ROUTE:
+        return await ainvoke_chunked(transcript, spec)
+    try:
+        return await llm_retry_policy.acall(ainvoke_json, transcript, spec)
+    except Exception as e:
+        if classify_failure(e) != LONG_TRANSCRIPT:
+            raise
+    print(f"Transcript too long for {spec.name}; classifying it in windows")
+    return await ainvoke_chunked(transcript, spec)
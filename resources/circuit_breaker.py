@@ -0,0 +1,178 @@
+import asyncio
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from resources.retry_policy import TRANSIENT, THROTTLED, FATAL, CANCELLED
+
+load_dotenv()
+
+# Trip after this many consecutive unavailability failures (timeouts, 5xx, dropped connections), fail fast for the
+# cool-down, then let CIRCUIT_PROBES calls through to test whether Gemini is back
+CIRCUIT_BREAKER_ENABLED = os.getenv("CIRCUIT_BREAKER_ENABLED", "true").lower() == "true"
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "10"))
+CIRCUIT_COOLDOWN_SECONDS = float(os.getenv("CIRCUIT_COOLDOWN_SECONDS", "60"))
+CIRCUIT_PROBES = int(os.getenv("CIRCUIT_PROBES", "1"))
+# Longest a classification step waits for Gemini to come back before giving up on its failed rows
+CIRCUIT_MAX_PAUSE_SECONDS = float(os.getenv("CIRCUIT_MAX_PAUSE_SECONDS", "3600"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+ASYNC_POLL_INTERVAL = 0.05
+
+
+class LLMUnavailableError(Exception):
+    """Raised instead of calling the LLM while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Process-wide circuit breaker around the LLM backend, shared by every parameter.
+
+    Closed: calls go through; `failure_threshold` consecutive TRANSIENT failures trip it. Open: calls fail fast with
+    LLMUnavailableError until `cooldown` seconds have passed. Half-open: up to `probes` calls go through while the
+    others wait for their outcome; a successful probe closes the breaker, a failed one opens it again.
+
+    Throttling is left to the retry policy and the adaptive concurrency limit, and answers that can't be parsed or
+    are too long still prove the LLM is up, so only TRANSIENT failures count. FATAL failures never reached the LLM
+    and CANCELLED calls were dropped before answering, so both leave the breaker as it is (a probe's slot is freed).
+    """
+
+    def __init__(self, failure_threshold, cooldown, probes=1, enabled=True):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.probes = max(1, probes)
+        self.enabled = enabled
+        self._condition = threading.Condition()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._trips = 0
+
+    def _refresh(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+
+    @property
+    def state(self):
+        with self._condition:
+            self._refresh()
+            return self._state
+
+    @property
+    def is_open(self):
+        return self.state == OPEN
+
+    def retry_in(self):
+        """Seconds until the breaker half-opens (0 if it isn't open)."""
+        with self._condition:
+            self._refresh()
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self.cooldown - (time.monotonic() - self._opened_at))
+
+    def _try_enter(self):
+        """Returns True (probe) / False (normal call) if the call may go ahead, None if it has to wait."""
+        self._refresh()
+        if self._state == CLOSED:
+            return False
+        if self._state == OPEN:
+            raise LLMUnavailableError(f"LLM unavailable: circuit breaker open for another {self.retry_in():.0f}s "
+                                      f"after {self.failure_threshold} consecutive failures")
+        if self._probes_in_flight < self.probes:
+            self._probes_in_flight += 1
+            return True
+        return None
+
+    def before_call(self):
+        """
+        Admits one call, waiting for the probes' outcome while half-open.
+
+        Returns:
+            bool: Whether the call is a probe; pass it to after_call.
+
+        Raises:
+            LLMUnavailableError: The breaker is open.
+        """
+        if not self.enabled:
+            return False
+        with self._condition:
+            while (probe := self._try_enter()) is None:
+                self._condition.wait(timeout=self.cooldown)
+            return probe
+
+    async def abefore_call(self):
+        """Async counterpart of before_call."""
+        if not self.enabled:
+            return False
+        while True:
+            with self._condition:
+                probe = self._try_enter()
+            if probe is not None:
+                return probe
+            await asyncio.sleep(ASYNC_POLL_INTERVAL)
+
+    def after_call(self, probe, failure_class=None):
+        """Records a call's outcome (failure_class None for success, else its class from classify_failure)."""
+        if not self.enabled:
+            return
+        with self._condition:
+            if probe:
+                self._probes_in_flight -= 1
+            if failure_class == TRANSIENT:
+                self._failures += 1
+                if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                    self._trip()
+            elif failure_class not in (THROTTLED, FATAL, CANCELLED):
+                # A success, or an answer that couldn't be used: either way the LLM is reachable
+                if self._state != CLOSED:
+                    print("LLM available again, circuit breaker closed")
+                self._state = CLOSED
+                self._failures = 0
+            self._condition.notify_all()
+
+    def _trip(self):
+        if self._state == CLOSED:
+            self._trips += 1
+            print(f"LLM unavailable after {self._failures} consecutive failures, circuit breaker open for "
+                  f"{self.cooldown:.0f}s")
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._probes_in_flight = 0
+
+    def wait_until_available(self, timeout):
+        """Blocks until calls may go through again (half-open or closed); returns False if timeout passes first."""
+        deadline = time.monotonic() + timeout
+        while (wait := self.retry_in()) > 0:
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+        return True
+
+    async def await_available(self, timeout):
+        """Async counterpart of wait_until_available."""
+        deadline = time.monotonic() + timeout
+        while (wait := self.retry_in()) > 0:
+            if time.monotonic() + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+        return True
+
+    def stats(self):
+        with self._condition:
+            self._refresh()
+            return {"state": self._state, "trips": self._trips, "consecutive_failures": self._failures}
+
+    def reset_stats(self):
+        with self._condition:
+            self._trips = 0
+
+
+llm_breaker = CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_COOLDOWN_SECONDS, CIRCUIT_PROBES,
+                             enabled=CIRCUIT_BREAKER_ENABLED)
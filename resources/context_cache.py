@@ -0,0 +1,296 @@
+import asyncio
+import hashlib
+import itertools
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+
+from dotenv import load_dotenv
+
+from resources.credential_pool import credential_pool
+from resources.llm_backend import LLM_BACKEND, LLM_CASSETTE_MODE
+from resources.llm_run import current_run, PerRun
+from resources.model import gemini_client
+from resources.retry_policy import classify_failure, THROTTLED
+
+load_dotenv()
+
+# "off" (default), "gemini" (server-side cached content) or "local" (in-process stand-in for offline runs)
+CONTEXT_CACHE_MODE = os.getenv("GEMINI_CONTEXT_CACHE_MODE", "off").lower()
+# Context caching needs an explicitly versioned model
+CONTEXT_CACHE_MODEL = os.getenv("GEMINI_CONTEXT_CACHE_MODEL", "models/gemini-1.5-flash-002")
+CONTEXT_CACHE_TTL = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL", "900"))
+# Gemini rejects cached contents below this size; shorter transcripts are sent the normal way
+CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("GEMINI_CONTEXT_CACHE_MIN_TOKENS", "32768"))
+
+
+@dataclass
+class ContextHandle:
+    """A transcript uploaded once as cached context, with the runs that use it."""
+    name: str
+    model: str
+    tokens: int
+    expires_at: float
+    owners: set = field(default_factory=set)
+    credential: object = None  # Credential of the project holding the content, for caches that spread over keys
+
+    @property
+    def expired(self):
+        # Leave a little headroom so a handle doesn't expire while a request is in flight
+        return time.time() > self.expires_at - 30
+
+
+class ContextCacheStats:
+    """Counts transcript tokens served from cached context vs. tokens sent fresh with each call."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.caches_created = 0
+            self.cached_calls = 0
+            self.cached_tokens = 0
+            self.fresh_tokens = 0
+
+    def record_create(self):
+        with self._lock:
+            self.caches_created += 1
+
+    def record_call(self, cached_tokens, fresh_tokens):
+        with self._lock:
+            self.cached_calls += 1 if cached_tokens else 0
+            self.cached_tokens += cached_tokens
+            self.fresh_tokens += fresh_tokens
+
+    def summary(self):
+        with self._lock:
+            total = self.cached_tokens + self.fresh_tokens
+            share = self.cached_tokens / total * 100 if total else 0.0
+            return (f"Context cache: {self.caches_created} transcripts cached, {self.cached_calls} calls served from "
+                    f"cache, {self.cached_tokens} cached / {self.fresh_tokens} fresh input tokens "
+                    f"({share:.1f}% cached)")
+
+
+class ContextCache(ABC):
+    """
+    Uploads a transcript once and answers several prompts against it.
+
+    Handles are kept per transcript for the lifetime of the TTL, so the parameter passes of one run (which each walk
+    every transcript) all reuse the same cached context. Each handle records the runs that used it, and a finished
+    run only deletes the contexts no other run is still using. Subclasses implement _create, _delete and ask.
+    """
+
+    def __init__(self, model, ttl=CONTEXT_CACHE_TTL, min_tokens=CONTEXT_CACHE_MIN_TOKENS):
+        self.model = model
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        self.stats = PerRun(ContextCacheStats)  # Per run (resources/llm_run.py)
+        self._handles = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    @staticmethod
+    def _key(transcript):
+        return hashlib.sha256(transcript.encode("utf-8")).hexdigest()
+
+    def handle_for(self, transcript, tokens):
+        """
+        Returns the cached context handle for transcript (of roughly `tokens` tokens), creating it on first use.
+
+        Returns None when the transcript is too short to be worth (or allowed) caching.
+        """
+        if tokens < self.min_tokens:
+            return None
+
+        key = self._key(transcript)
+        run = current_run.get()
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                previous = self._handles.get(key)
+                if previous is not None and not previous.expired:
+                    previous.owners.add(run)
+                    return previous
+            handle = self._create(transcript, tokens)
+            handle.owners = {run} | (previous.owners if previous is not None else set())
+            with self._lock:
+                self._handles[key] = handle
+            self.stats.current().record_create()
+        return handle
+
+    @abstractmethod
+    def ask(self, handle, prompt, generation_config=None):
+        """Asks prompt against the cached transcript and returns the raw answer text."""
+
+    async def aask(self, handle, prompt, generation_config=None):
+        return await asyncio.to_thread(self.ask, handle, prompt, generation_config)
+
+    @abstractmethod
+    def _create(self, transcript, tokens):
+        """Uploads transcript and returns its ContextHandle."""
+
+    @abstractmethod
+    def _delete(self, handle):
+        """Deletes the cached context behind handle."""
+
+    def release_run(self, run):
+        """
+        Deletes the cached contexts used by run that no other run is using (they would otherwise live until the TTL).
+
+        Args:
+            run (int): Run from llm_run.start_run, or None for calls made outside any run.
+        """
+        released = []
+        with self._lock:
+            for key, handle in list(self._handles.items()):
+                handle.owners.discard(run)
+                if not handle.owners:
+                    released.append(handle)
+                    del self._handles[key]
+                    self._key_locks.pop(key, None)
+        for handle in released:
+            try:
+                self._delete(handle)
+            except Exception as e:
+                print(f"Failed to delete cached context {handle.name}: {e}")
+
+
+class GeminiContextCache(ContextCache):
+    """
+    Context cache backed by Gemini cached contents (CacheService) and the cached_content generation option.
+
+    Each transcript is uploaded with the credential pool's least busy key, and every question about it goes through
+    the pool pinned to that key (cached contents belong to one project), so the pool sees this traffic and its 429s.
+    """
+
+    def __init__(self, model=CONTEXT_CACHE_MODEL, pool=credential_pool, **kwargs):
+        super().__init__(model, **kwargs)
+        from google.ai import generativelanguage as glm
+
+        self._glm = glm
+        self.pool = pool
+        self._clients = {}
+        self._clients_lock = threading.Lock()
+
+    def _clients_for(self, credential):
+        """(CacheServiceClient, chat model) for the credential's key, created on first use."""
+        with self._clients_lock:
+            if credential.api_key not in self._clients:
+                self._clients[credential.api_key] = (
+                    self._glm.CacheServiceClient(client_options={"api_key": credential.api_key}),
+                    gemini_client(self.model, credential.api_key))
+            return self._clients[credential.api_key]
+
+    def _release(self, credential, error=None):
+        self.pool.release(credential, failed=error is not None,
+                          throttled=error is not None and classify_failure(error) == THROTTLED)
+
+    def _create(self, transcript, tokens):
+        cached_content = self._glm.CachedContent(
+            model=self.model,
+            contents=[self._glm.Content(role="user", parts=[self._glm.Part(text=transcript)])],
+            ttl={"seconds": self.ttl})
+        credential, error = self.pool.acquire(), None
+        try:
+            created = self._clients_for(credential)[0].create_cached_content(cached_content=cached_content, retry=None)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._release(credential, error)
+        tokens = created.usage_metadata.total_token_count or tokens
+        return ContextHandle(name=created.name, model=self.model, tokens=tokens,
+                             expires_at=time.time() + self.ttl, credential=credential)
+
+    def _delete(self, handle):
+        self._clients_for(handle.credential)[0].delete_cached_content(name=handle.name, retry=None)
+
+    def ask(self, handle, prompt, generation_config=None):
+        credential, error = self.pool.acquire(handle.credential), None
+        try:
+            llm = self._clients_for(credential)[1]
+            return llm.invoke(prompt, cached_content=handle.name, generation_config=generation_config).content
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._release(credential, error)
+
+    async def aask(self, handle, prompt, generation_config=None):
+        credential, error = self.pool.acquire(handle.credential), None
+        try:
+            llm = self._clients_for(credential)[1]
+            response = await llm.ainvoke(prompt, cached_content=handle.name, generation_config=generation_config)
+            return response.content
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._release(credential, error)
+
+
+class LocalContextCache(ContextCache):
+    """
+    In-process stand-in for the Gemini cache API, for offline runs and tests.
+
+    Keeps the transcript in memory under a fake cachedContents/ name, honours the TTL and delegates each question to
+    invoke(full_prompt), which defaults to the configured LLM backend but can be any callable returning answer text.
+    Each answer therefore matches what a fresh call would return; only the token accounting differs.
+    """
+
+    def __init__(self, model=None, invoke=None, **kwargs):
+        super().__init__(model, **kwargs)
+        self._invoke = invoke
+        self._contents = {}
+        self._ids = itertools.count(1)
+
+    def _create(self, transcript, tokens):
+        name = f"cachedContents/local-{next(self._ids)}"
+        self._contents[name] = transcript
+        return ContextHandle(name=name, model=self.model, tokens=tokens, expires_at=time.time() + self.ttl)
+
+    def _delete(self, handle):
+        self._contents.pop(handle.name, None)
+
+    def ask(self, handle, prompt, generation_config=None):
+        transcript = self._contents.get(handle.name)
+        if transcript is None or handle.expired:
+            raise KeyError(f"Cached context {handle.name} not found or expired")
+
+        from resources.llm_client import build_prompt, model_route
+        full_prompt = build_prompt(transcript, prompt)
+        if self._invoke:
+            return self._invoke(full_prompt)
+        from resources.llm_backend import llm_backend
+        return llm_backend.complete(full_prompt, model_route(full_prompt), generation_config)
+
+
+def create_context_cache(mode=CONTEXT_CACHE_MODE, backend=LLM_BACKEND, cassette_mode=LLM_CASSETTE_MODE):
+    if mode == "gemini":
+        # Questions about Gemini cached contents go straight to Gemini, past the configured backend
+        if backend != "gemini" or cassette_mode != "off":
+            raise ValueError(f"GEMINI_CONTEXT_CACHE_MODE=gemini needs LLM_BACKEND=gemini and LLM_CASSETTE_MODE=off "
+                             f"(got '{backend}' / '{cassette_mode}'); use GEMINI_CONTEXT_CACHE_MODE=local instead")
+        return GeminiContextCache()
+    if mode == "local":
+        return LocalContextCache()
+    return None
+
+
+context_cache = create_context_cache()
+
+
+def finish_context_cache_run():
+    """Releases this run's cached contexts and prints the cached vs. fresh token summary."""
+    if context_cache is None:
+        return
+    summary = context_cache.stats.finish().summary()
+    print(summary)
+    context_cache.release_run(current_run.get())
+    return summary
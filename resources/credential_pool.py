@@ -0,0 +1,123 @@
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Comma separated Gemini API keys (one per project/quota) to spread calls across; falls back to GEMINI_API
+GEMINI_API_KEYS = [key.strip() for key in os.getenv("GEMINI_API_KEYS", "").split(",") if key.strip()]
+# A key that returns 429 is skipped for this long, doubling for each further 429 in a row
+GEMINI_KEY_COOLDOWN_SECONDS = float(os.getenv("GEMINI_KEY_COOLDOWN_SECONDS", "30"))
+GEMINI_KEY_MAX_COOLDOWN_SECONDS = float(os.getenv("GEMINI_KEY_MAX_COOLDOWN_SECONDS", "600"))
+
+
+class Credential:
+    """One API key with its usage counters and rate-limit state."""
+
+    def __init__(self, label, api_key):
+        self.label = label
+        self.api_key = api_key
+        self.in_flight = 0
+        self.calls = 0
+        self.throttled = 0
+        self.errors = 0
+        self.consecutive_throttles = 0
+        self.cooldown_until = 0.0
+
+    def stats(self, now):
+        return {"calls": self.calls, "throttled": self.throttled, "errors": self.errors, "in_flight": self.in_flight,
+                "cooldown_seconds": round(max(0.0, self.cooldown_until - now), 1)}
+
+
+class CredentialPool:
+    """
+    Spreads LLM calls across several API keys so throughput isn't capped by a single project's quota.
+
+    Each call takes the key with the fewest calls in flight (then the least used) among the keys that aren't
+    cooling down; a key that answers 429 cools down for `cooldown` seconds, doubling per consecutive 429 up to
+    `max_cooldown`. If every key is cooling down, the one that recovers first is used, and the retry policy's
+    backoff paces the call.
+    """
+
+    def __init__(self, api_keys, cooldown=GEMINI_KEY_COOLDOWN_SECONDS, max_cooldown=GEMINI_KEY_MAX_COOLDOWN_SECONDS):
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._lock = threading.Lock()
+        # Labels identify keys in logs and metrics without printing them
+        self._credentials = [Credential(f"key{index}(...{api_key[-4:]})", api_key)
+                             for index, api_key in enumerate(api_keys, start=1)]
+
+    def __len__(self):
+        return len(self._credentials)
+
+    @property
+    def api_keys(self):
+        return [credential.api_key for credential in self._credentials]
+
+    def acquire(self, credential=None):
+        """
+        Returns the credential to use for one call; hand it back with release.
+
+        Args:
+            credential (Credential): Use this key even if it's cooling down (e.g. for content that lives in its
+                project), or None to pick one.
+        """
+        with self._lock:
+            if credential is None:
+                now = time.monotonic()
+                available = [candidate for candidate in self._credentials if candidate.cooldown_until <= now]
+                if available:
+                    credential = min(available, key=lambda c: (c.in_flight, c.calls))
+                else:
+                    credential = min(self._credentials, key=lambda c: c.cooldown_until)
+            credential.in_flight += 1
+            credential.calls += 1
+            return credential
+
+    def release(self, credential, failed=False, throttled=False):
+        """
+        Records the outcome of a call made with credential.
+
+        Args:
+            credential (Credential): Value returned by acquire.
+            failed (bool): The call raised.
+            throttled (bool): The call was rejected with 429 / RESOURCE_EXHAUSTED; the key cools down.
+        """
+        with self._lock:
+            credential.in_flight -= 1
+            if throttled:
+                credential.throttled += 1
+                credential.consecutive_throttles += 1
+                cooldown = min(self.max_cooldown, self.cooldown * 2 ** (credential.consecutive_throttles - 1))
+                credential.cooldown_until = time.monotonic() + cooldown
+                return
+            credential.consecutive_throttles = 0
+            if failed:
+                credential.errors += 1
+
+    def throttled_everywhere(self):
+        """
+        False while some keys are cooling down after a 429 and others still have quota, i.e. while throttling is
+        handled by routing around the throttled keys; True otherwise (including when no key is cooling down, as for
+        backends that don't use the pool).
+        """
+        with self._lock:
+            now = time.monotonic()
+            cooling = [credential.cooldown_until > now for credential in self._credentials]
+            return all(cooling) or not any(cooling)
+
+    def stats(self):
+        """Per-key usage: label -> calls, throttled, errors, in_flight and remaining cooldown."""
+        with self._lock:
+            now = time.monotonic()
+            return {credential.label: credential.stats(now) for credential in self._credentials}
+
+    def reset_stats(self):
+        with self._lock:
+            for credential in self._credentials:
+                credential.calls = credential.throttled = credential.errors = 0
+
+
+credential_pool = CredentialPool(GEMINI_API_KEYS or [os.getenv("GEMINI_API", "")])
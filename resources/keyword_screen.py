@@ -0,0 +1,32 @@
+import re
+
+
+def compile_keyword_matcher(english_keywords, devanagari_keywords=()):
+    """
+    Compiles keyword lists into a single regex so a transcript is scanned once for all of them.
+
+    English keywords match case-insensitively on word boundaries, with any whitespace between words. Devanagari
+    keywords match as plain substrings, since vowel signs don't count as word characters for \\b.
+
+    Returns:
+        Pattern: Compiled matcher; use .search(text).
+    """
+    english = sorted({keyword.strip().lower() for keyword in english_keywords}, key=len, reverse=True)
+    devanagari = sorted({keyword.strip() for keyword in devanagari_keywords}, key=len, reverse=True)
+
+    alternatives = []
+    if english:
+        words = (r"\s+".join(map(re.escape, keyword.split())) for keyword in english)
+        alternatives.append(r"\b(?:" + "|".join(words) + r")\b")
+    if devanagari:
+        alternatives.append("(?:" + "|".join(map(re.escape, devanagari)) + ")")
+    return re.compile("|".join(alternatives), re.IGNORECASE)
+
+
+def keyword_screen(matcher):
+    """Returns a prescreen function: True when the transcript contains a keyword (so the LLM has to look at it)."""
+
+    def needs_llm(transcript):
+        return bool(matcher.search(str(transcript)))
+
+    return needs_llm
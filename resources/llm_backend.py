@@ -0,0 +1,451 @@
+import asyncio
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import httpx
+from dotenv import load_dotenv
+
+from resources.circuit_breaker import llm_breaker, CLOSED
+from resources.credential_pool import credential_pool
+from resources.llm_dispatcher import LLM_MAX_CONCURRENCY, llm_concurrency
+from resources.llm_metrics import llm_metrics, percentile
+from resources.model import get_route_llm, LLM_ROUTES
+from resources.rate_limiter import gemini_rate_limiter
+from resources.retry_policy import classify_failure, THROTTLED, CANCELLED
+
+load_dotenv()
+
+# "gemini" (default) or "stub" (local HTTP stub server, see resources/llm_stub_server.py)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini").lower()
+LLM_STUB_URL = os.getenv("LLM_STUB_URL", "http://127.0.0.1:8765/generate")
+LLM_STUB_TIMEOUT = float(os.getenv("LLM_STUB_TIMEOUT", "120"))
+# "off" (default), "record" (save every call of this run) or "replay" (answer from the cassette, no LLM at all)
+LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "off").lower()
+LLM_CASSETTE_PATH = os.getenv("LLM_CASSETTE_PATH", "llm_cassette.jsonl.gz")
+# Send a duplicate of a call still running after the LLM_HEDGE_PERCENTILE latency of its route, for at most
+# LLM_HEDGE_MAX_RATE of all calls, and use whichever answer arrives first
+LLM_HEDGING = os.getenv("LLM_HEDGING", "false").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MAX_RATE = float(os.getenv("LLM_HEDGE_MAX_RATE", "0.05"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "50"))
+
+LATENCY_WINDOW = 1000  # Recent successful calls per route the hedge threshold is computed from
+THRESHOLD_REFRESH = 25  # Recompute a route's threshold after this many new samples
+
+
+class LLMBackendError(Exception):
+    """Raised by backends for failed calls; the message carries the HTTP status so retries can classify it."""
+
+
+class CassetteMissError(LLMBackendError):
+    """Raised in replay mode for a prompt the cassette has no recording of; retrying can't help."""
+
+
+class LLMBackend(ABC):
+    """
+    Text-in, text-out completion interface used by resources/llm_client.py.
+
+    Args (for complete/acomplete):
+        text (str): Full prompt.
+        route (str): Route from the routing table in resources/model.py.
+        generation_config (dict): Per-call generation options (structured output schema), or None.
+    """
+    name = "base"
+
+    @abstractmethod
+    def model_name(self, route):
+        """Model identity used in response cache keys, so answers of different backends never mix."""
+
+    @abstractmethod
+    def complete(self, text, route, generation_config=None):
+        """Returns the answer text for text."""
+
+    @abstractmethod
+    async def acomplete(self, text, route, generation_config=None):
+        """Async counterpart of complete."""
+
+    def finish_run(self):
+        """End-of-run hook (see llm_client.finish_llm_run)."""
+
+
+class GeminiBackend(LLMBackend):
+    """Gemini through the LangChain clients of the routing table, spreading calls over the credential pool's keys."""
+    name = "gemini"
+
+    def __init__(self, pool=credential_pool):
+        self.pool = pool
+
+    def model_name(self, route):
+        return next(model for name, model, _ in LLM_ROUTES if name == route)
+
+    def _release(self, credential, error=None):
+        self.pool.release(credential, failed=error is not None,
+                          throttled=error is not None and classify_failure(error) == THROTTLED)
+
+    def complete(self, text, route, generation_config=None):
+        credential, error = self.pool.acquire(), None
+        try:
+            return get_route_llm(route, credential.api_key).invoke(text, generation_config=generation_config).content
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._release(credential, error)
+
+    async def acomplete(self, text, route, generation_config=None):
+        credential, error = self.pool.acquire(), None
+        try:
+            response = await get_route_llm(route, credential.api_key).ainvoke(text, generation_config=generation_config)
+            return response.content
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # Also runs when a hedged duplicate wins and this call is cancelled
+            self._release(credential, error)
+
+
+class StubHTTPBackend(LLMBackend):
+    """Posts prompts to the local stub server, for offline benchmarks and load tests."""
+    name = "stub"
+
+    def __init__(self, url=LLM_STUB_URL, timeout=LLM_STUB_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+        self._client = httpx.Client(timeout=timeout)
+        self._async_client = None
+
+    def model_name(self, route):
+        return f"stub:{route}"
+
+    def _payload(self, text, route, generation_config):
+        return {"model": self.model_name(route), "prompt": text,
+                "response_schema": (generation_config or {}).get("response_schema")}
+
+    @staticmethod
+    def _content(response):
+        if response.status_code != 200:
+            raise LLMBackendError(f"{response.status_code} {response.text}")
+        return response.json()["content"]
+
+    def complete(self, text, route, generation_config=None):
+        return self._content(self._client.post(self.url, json=self._payload(text, route, generation_config)))
+
+    async def acomplete(self, text, route, generation_config=None):
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(timeout=self.timeout)
+        response = await self._async_client.post(self.url, json=self._payload(text, route, generation_config))
+        return self._content(response)
+
+
+class CassetteBackend(LLMBackend):
+    """
+    Records calls of a real backend to a gzipped JSON-lines cassette, or replays them with the observed latencies.
+
+    Entries are keyed by a hash of model, prompt and response schema and hold the answer (or the error message of a
+    failed call) plus how long the call took, so a replayed run sees the same answers, failures and timings as the
+    recorded one. A prompt recorded several times (e.g. retried) is replayed in recorded order.
+
+    The response cache and checkpoints answer before the backend is reached; turn them off (LLM_CACHE_ENABLED=false,
+    CHECKPOINT_ENABLED=false) for both the recording and the replayed run to compare like with like.
+    """
+    name = "cassette"
+
+    def __init__(self, inner, path, mode):
+        self.inner = inner
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._file = None
+        self._recordings = defaultdict(list)
+        self._positions = defaultdict(int)
+        if mode == "replay":
+            self._load()
+        atexit.register(self.close)
+
+    def _load(self):
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as cassette:
+                for line in cassette:
+                    entry = json.loads(line)
+                    self._recordings[entry["key"]].append(entry)
+        except (EOFError, json.JSONDecodeError) as e:
+            # A recording process that was killed leaves its last gzip member unfinished; keep what was read
+            print(f"Cassette {self.path} ends with an incomplete recording ({e}); replaying the calls before it")
+        print(f"Loaded {sum(map(len, self._recordings.values()))} recorded LLM calls from {self.path}")
+
+    def model_name(self, route):
+        return self.inner.model_name(route)
+
+    def _key(self, text, route, generation_config):
+        digest = hashlib.sha256()
+        schema = (generation_config or {}).get("response_schema")
+        for part in (self.model_name(route), text, json.dumps(schema, sort_keys=True)):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def _record(self, key, latency, content=None, error=None):
+        with self._lock:
+            if self._file is None:
+                # One gzip member per run: finish_run closes it, the next call of a later run appends a new one
+                self._file = gzip.open(self.path, "at", encoding="utf-8")
+            self._file.write(json.dumps({"key": key, "latency": round(latency, 4), "content": content,
+                                         "error": error}, ensure_ascii=False) + "\n")
+
+    def _next_entry(self, key):
+        with self._lock:
+            entries = self._recordings.get(key)
+            if not entries:
+                raise CassetteMissError(f"Cassette {self.path} has no recording for this prompt")
+            entry = entries[self._positions[key] % len(entries)]
+            self._positions[key] += 1
+        return entry
+
+    @staticmethod
+    def _replay(entry):
+        if entry["error"] is not None:
+            raise LLMBackendError(entry["error"])
+        return entry["content"]
+
+    def complete(self, text, route, generation_config=None):
+        key = self._key(text, route, generation_config)
+        if self.mode == "replay":
+            entry = self._next_entry(key)
+            time.sleep(entry["latency"])
+            return self._replay(entry)
+
+        started = time.monotonic()
+        try:
+            content = self.inner.complete(text, route, generation_config)
+        except Exception as e:
+            self._record(key, time.monotonic() - started, error=str(e))
+            raise
+        self._record(key, time.monotonic() - started, content=content)
+        return content
+
+    async def acomplete(self, text, route, generation_config=None):
+        key = self._key(text, route, generation_config)
+        if self.mode == "replay":
+            entry = self._next_entry(key)
+            await asyncio.sleep(entry["latency"])
+            return self._replay(entry)
+
+        started = time.monotonic()
+        try:
+            content = await self.inner.acomplete(text, route, generation_config)
+        except Exception as e:
+            await asyncio.to_thread(self._record, key, time.monotonic() - started, None, str(e))
+            raise
+        await asyncio.to_thread(self._record, key, time.monotonic() - started, content)
+        return content
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def finish_run(self):
+        """Closes this run's recording, so a process killed later can't leave it truncated."""
+        self.close()
+
+
+class HedgedBackend(LLMBackend):
+    """
+    Cuts tail latency by hedging slow calls: when a call hasn't answered within the LLM_HEDGE_PERCENTILE latency of
+    recent calls on its route, the same prompt is sent again and the first answer wins.
+
+    Classification calls are idempotent, so the losing answer is simply dropped (cancelled on the async path, left
+    to finish on the sync one). A hedge is only sent while the circuit breaker is closed, hedges stay under max_rate
+    of all calls and the rate limiter and llm_concurrency have room for it right now; routes with fewer than
+    min_samples observed calls are never hedged. The hedge's concurrency slot is held until it is done (on the sync
+    path, until the losing call is done too, since it keeps running), and its outcome is reported to llm_concurrency
+    and the circuit breaker like any other call's; the credential pool sees it through the inner backend.
+    """
+    name = "hedged"
+
+    def __init__(self, inner, pct=LLM_HEDGE_PERCENTILE, max_rate=LLM_HEDGE_MAX_RATE, min_samples=LLM_HEDGE_MIN_SAMPLES):
+        self.inner = inner
+        self.pct = pct
+        self.max_rate = max_rate
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._latencies = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+        self._thresholds = {}
+        self._new_samples = defaultdict(int)
+        self._calls = self._hedges = self._hedge_wins = 0
+        # Primary and hedge both run here so the caller's thread can wait on whichever finishes first
+        self._executor = ThreadPoolExecutor(max_workers=2 * LLM_MAX_CONCURRENCY, thread_name_prefix="llm-hedge")
+
+    def model_name(self, route):
+        return self.inner.model_name(route)
+
+    def _observe(self, route, latency):
+        with self._lock:
+            self._latencies[route].append(latency)
+            self._new_samples[route] += 1
+            if self._new_samples[route] >= THRESHOLD_REFRESH or route not in self._thresholds:
+                self._new_samples[route] = 0
+                samples = self._latencies[route]
+                self._thresholds[route] = percentile(samples, self.pct) if len(samples) >= self.min_samples else None
+
+    def _threshold(self, route):
+        with self._lock:
+            self._calls += 1
+            return self._thresholds.get(route)
+
+    def _allow_hedge(self, text):
+        with self._lock:
+            if self._hedges + 1 > self.max_rate * self._calls:
+                return False
+            # Same ~4 characters per token estimate as llm_client.estimate_tokens
+            if not gemini_rate_limiter.try_acquire(len(text) // 4 + 1):
+                return False
+            self._hedges += 1
+            return True
+
+    def _hedge_slot(self, text):
+        """Concurrency slot for a hedge of text, or None if no hedge may be sent now."""
+        if llm_breaker.state != CLOSED:
+            return None
+        slot = llm_concurrency.try_acquire()
+        if slot is not None and not self._allow_hedge(text):
+            llm_concurrency.release(slot, CANCELLED)
+            return None
+        return slot
+
+    @staticmethod
+    def _failure_class(future):
+        """Outcome of a finished future or task as a failure class (None for an answer)."""
+        if future.cancelled():
+            return CANCELLED
+        error = future.exception()
+        return None if error is None else classify_failure(error)
+
+    @staticmethod
+    def _report_hedge(slot, failure_class):
+        llm_concurrency.release(slot, failure_class)
+        if failure_class != CANCELLED:
+            llm_breaker.after_call(False, failure_class)
+
+    def _report_when_done(self, slot, hedge, futures):
+        """Reports the hedge's outcome and frees its slot once every one of futures is done."""
+        remaining = [len(futures)]
+
+        def done(_):
+            with self._lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            self._report_hedge(slot, self._failure_class(hedge))
+
+        for future in futures:
+            future.add_done_callback(done)
+
+    def _won(self):
+        with self._lock:
+            self._hedge_wins += 1
+
+    def _timed(self, text, route, generation_config):
+        started = time.monotonic()
+        content = self.inner.complete(text, route, generation_config)
+        self._observe(route, time.monotonic() - started)
+        return content
+
+    async def _atimed(self, text, route, generation_config):
+        started = time.monotonic()
+        content = await self.inner.acomplete(text, route, generation_config)
+        self._observe(route, time.monotonic() - started)
+        return content
+
+    def complete(self, text, route, generation_config=None):
+        delay = self._threshold(route)
+        if delay is None:
+            return self._timed(text, route, generation_config)
+
+        primary = self._executor.submit(self._timed, text, route, generation_config)
+        done, _ = wait([primary], timeout=delay)
+        if done or (slot := self._hedge_slot(text)) is None:
+            return primary.result()
+
+        hedge = self._executor.submit(self._timed, text, route, generation_config)
+        # The losing call can't be stopped here, so the hedge's slot stays taken until both calls are done
+        self._report_when_done(slot, hedge, [primary, hedge])
+        pending, error = {primary, hedge}, None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._won()
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+    async def acomplete(self, text, route, generation_config=None):
+        delay = self._threshold(route)
+        if delay is None:
+            return await self._atimed(text, route, generation_config)
+
+        primary = asyncio.ensure_future(self._atimed(text, route, generation_config))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or (slot := self._hedge_slot(text)) is None:
+            return await primary
+
+        hedge = asyncio.ensure_future(self._atimed(text, route, generation_config))
+        self._report_when_done(slot, hedge, [hedge])
+        pending, error = {primary, hedge}, None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._won()
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self):
+        with self._lock:
+            rate = self._hedges / self._calls if self._calls else 0.0
+            thresholds = {route: round(value, 2) for route, value in self._thresholds.items() if value is not None}
+            return {"calls": self._calls, "hedges": self._hedges, "hedge_rate": round(rate, 4),
+                    "hedge_wins": self._hedge_wins, "thresholds_seconds": thresholds}
+
+    def reset_stats(self):
+        with self._lock:
+            self._calls = self._hedges = self._hedge_wins = 0
+
+
+def create_backend(name=LLM_BACKEND, cassette_mode=LLM_CASSETTE_MODE, hedging=LLM_HEDGING):
+    if name == "stub":
+        backend = StubHTTPBackend()
+    elif name == "gemini":
+        backend = GeminiBackend()
+        if len(credential_pool) > 1:
+            llm_metrics.register_gauge("credentials", credential_pool.stats, credential_pool.reset_stats)
+    else:
+        raise ValueError(f"Unknown LLM_BACKEND '{name}' (expected 'gemini' or 'stub')")
+
+    if hedging:
+        backend = HedgedBackend(backend)
+        llm_metrics.register_gauge("hedging", backend.stats, backend.reset_stats)
+    if cassette_mode in ("record", "replay"):
+        return CassetteBackend(backend, LLM_CASSETTE_PATH, cassette_mode)
+    return backend
+
+
+llm_backend = create_backend()
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "200000"))
+# Skip cache reads (fresh answers are still written back)
+LLM_CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "false").lower() == "true"
+
+EVICTION_INTERVAL = 500  # Inserts between size checks
+
+
+class LLMResponseCache:
+    """
+    Disk-backed cache of parsed LLM answers, keyed by a hash of model name, prompt and transcript.
+
+    Only answers that parsed successfully are stored, so a bad answer is never replayed. When the table grows past
+    max_entries the least recently used rows are evicted.
+    """
+
+    def __init__(self, path, max_entries, enabled=True, bypass=False):
+        self.path = path
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.bypass = bypass
+        self._inserts = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    @staticmethod
+    def make_key(model, prompt, transcript):
+        digest = hashlib.sha256()
+        for part in (model, prompt, transcript):
+            digest.update(str(part).encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS responses "
+                               "(key TEXT PRIMARY KEY, response TEXT NOT NULL, last_used REAL NOT NULL)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used)")
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key):
+        """Returns the cached answer for key, or None on a miss (or when reads are bypassed)."""
+        if not self.enabled or self.bypass:
+            return None
+
+        with self._lock:
+            conn = self._connection()
+            found = conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if found is None:
+                return None
+            conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+        return json.loads(found[0])
+
+    def put(self, key, response):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            conn = self._connection()
+            conn.execute("INSERT OR REPLACE INTO responses (key, response, last_used) VALUES (?, ?, ?)",
+                         (key, json.dumps(response, ensure_ascii=False), time.time()))
+            self._inserts += 1
+            if self._inserts % EVICTION_INTERVAL == 0:
+                self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn):
+        conn.execute("DELETE FROM responses WHERE key IN "
+                     "(SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def clear(self):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+
+
+llm_cache = LLMResponseCache(LLM_CACHE_PATH, LLM_CACHE_MAX_ENTRIES, enabled=LLM_CACHE_ENABLED,
+                             bypass=LLM_CACHE_BYPASS)
@@ -0,0 +1,217 @@
+import asyncio
+import os
+import threading
+import time
+from collections import Counter
+
+from dotenv import load_dotenv
+
+from resources.circuit_breaker import llm_breaker
+from resources.context_cache import context_cache, finish_context_cache_run
+from resources.llm_backend import llm_backend
+from resources.llm_cache import llm_cache
+from resources.llm_dispatcher import llm_concurrency
+from resources.llm_metrics import llm_metrics
+from resources.llm_run import start_run, PerRun
+from resources.model import route_for, CHUNKED_ROUTE, LLM_ROUTES
+from resources.rate_limiter import gemini_rate_limiter
+from resources.result_extractor_cleaner import extract_structured_json
+from resources.retry_policy import classify_failure, CANCELLED
+
+load_dotenv()
+
+llm_metrics.register_gauge("concurrency", llm_concurrency.stats, llm_concurrency.reset_stats)
+llm_metrics.register_gauge("circuit", llm_breaker.stats, llm_breaker.reset_stats)
+
+# Ask Gemini for JSON constrained to each parameter's response schema instead of scraping ```json blocks
+LLM_STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "true").lower() == "true"
+
+
+def build_prompt(transcript, prompt):
+    return f"{transcript}\n\n\n\n\n\n{prompt}"
+
+
+def estimate_tokens(text):
+    """Rough token count used for quota accounting (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+class RouteCounter:
+    """Counts how many transcript classifications went to each route during a run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def record(self, route):
+        with self._lock:
+            self._counts[route] += 1
+
+    def summary(self):
+        with self._lock:
+            counts = dict(self._counts)
+        routes = [route for route, _, _ in LLM_ROUTES] + [CHUNKED_ROUTE]
+        return "Model routes: " + ", ".join(f"{route}={counts.get(route, 0)}" for route in routes)
+
+
+# Route counts of each run (resources/llm_run.py)
+route_counts = PerRun(RouteCounter)
+
+
+def route_transcript(transcript, spec):
+    """
+    Pre-flight token budgeting: picks the route for one transcript before anything is sent.
+
+    Returns:
+        str: A model route from the routing table in resources/model.py, or CHUNKED_ROUTE if the prompt is too
+        large for every model.
+    """
+    route = route_for(estimate_tokens(build_prompt(transcript, spec.prompt)))
+    route_counts.current().record(route)
+    return route
+
+
+def model_route(text):
+    """Route for a prompt that is sent whole (the largest model if nothing in the table takes it)."""
+    route = route_for(estimate_tokens(text))
+    return LLM_ROUTES[-1][0] if route == CHUNKED_ROUTE else route
+
+
+def answer_model(transcript, text):
+    """Model whose answer is returned (the context cache pins its own model version for the transcripts it takes)."""
+    if context_cache is not None and estimate_tokens(transcript) >= context_cache.min_tokens:
+        return context_cache.model
+    return llm_backend.model_name(model_route(text))
+
+
+def start_llm_run():
+    """
+    Start-of-run bookkeeping: metrics, route counts and cached contexts of calls made from here on (including by the
+    threads and tasks the run starts) belong to this run, so concurrent runs don't mix or reset each other's.
+    """
+    start_run()
+    llm_metrics.start_run()
+
+
+def finish_llm_run():
+    """
+    End-of-run bookkeeping: prints this run's route counts and per-parameter LLM metrics, releases/reports its context
+    cache use and lets the backend close what it keeps open (the cassette being recorded).
+    """
+    print(route_counts.finish().summary())
+    print(llm_metrics.summary())
+    llm_metrics.write()
+    llm_metrics.reset()
+    finish_context_cache_run()
+    llm_backend.finish_run()
+
+
+def generation_config(spec):
+    """Per-call generation options: JSON output constrained to the spec's response schema."""
+    if not LLM_STRUCTURED_OUTPUT:
+        return None
+    return {"response_mime_type": "application/json", "response_schema": spec.response_schema}
+
+
+def context_handle(transcript, text):
+    """Returns the cached context handle for transcript, or None to send the full prompt as usual."""
+    if context_cache is None:
+        return None
+    handle = context_cache.handle_for(transcript, estimate_tokens(transcript))
+    if handle is None:
+        context_cache.stats.current().record_call(0, estimate_tokens(text))
+    else:
+        context_cache.stats.current().record_call(handle.tokens, estimate_tokens(text) - estimate_tokens(transcript))
+    return handle
+
+
+def parse_answer(content, spec):
+    """Parses and validates the answer text; raises ValueError if it can't be used."""
+    extracted = extract_structured_json(content, spec.response_schema)
+    spec.validate(extracted)
+    return extracted
+
+
+def record_call(spec, text, started, content=None, failure_class=None):
+    """Adds one LLM call to the per-parameter metrics (resources/llm_metrics.py)."""
+    llm_metrics.record_call(spec.name, time.monotonic() - started, estimate_tokens(text),
+                            estimate_tokens(content) if content else 0, failure_class)
+
+
+def invoke_json(transcript, spec):
+    """
+    Sends one transcript + the spec's prompt to Gemini and returns the parsed JSON answer.
+
+    Answers are served from the persistent response cache when possible. Otherwise the call blocks until it fits
+    in the process-wide rate limit and goes to the configured backend (LLM_BACKEND), using the model the routing
+    table (resources/model.py) picks for the prompt size. With context caching on, long transcripts are uploaded once
+    and each prompt is asked against the cached copy. Only answers that pass validation are cached. The number of
+    calls in flight is bounded by the adaptive llm_concurrency limit, and every call is recorded in llm_metrics.
+    While the circuit breaker is open, calls fail fast with LLMUnavailableError instead of reaching the backend.
+    """
+    text = build_prompt(transcript, spec.prompt)
+    cache_key = llm_cache.make_key(answer_model(transcript, text), spec.prompt, transcript)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        llm_metrics.record_cache_hit(spec.name)
+        return cached
+
+    probe = llm_breaker.before_call()
+    gemini_rate_limiter.acquire(estimate_tokens(text))
+    slot = llm_concurrency.acquire()
+    started, content, failure_class = time.monotonic(), None, None
+    try:
+        handle = context_handle(transcript, text)
+        if handle is not None:
+            content = context_cache.ask(handle, spec.prompt, generation_config(spec))
+        else:
+            content = llm_backend.complete(text, model_route(text), generation_config(spec))
+        extracted = parse_answer(content, spec)
+    except Exception as e:
+        failure_class = classify_failure(e)
+        raise
+    finally:
+        llm_concurrency.release(slot, failure_class)
+        llm_breaker.after_call(probe, failure_class)
+        record_call(spec, text, started, content, failure_class)
+
+    llm_cache.put(cache_key, extracted)
+    return extracted
+
+
+async def ainvoke_json(transcript, spec):
+    """Async counterpart of invoke_json; never blocks the event loop."""
+    text = build_prompt(transcript, spec.prompt)
+    cache_key = llm_cache.make_key(answer_model(transcript, text), spec.prompt, transcript)
+    cached = await asyncio.to_thread(llm_cache.get, cache_key)
+    if cached is not None:
+        llm_metrics.record_cache_hit(spec.name)
+        return cached
+
+    probe = await llm_breaker.abefore_call()
+    slot, content, failure_class = None, None, None
+    # The task can be cancelled at any await from here on (e.g. a cancelled request), so the probe is always released
+    try:
+        await gemini_rate_limiter.acquire_async(estimate_tokens(text))
+        slot = await llm_concurrency.acquire_async()
+        started = time.monotonic()
+        handle = await asyncio.to_thread(context_handle, transcript, text)
+        if handle is not None:
+            content = await context_cache.aask(handle, spec.prompt, generation_config(spec))
+        else:
+            content = await llm_backend.acomplete(text, model_route(text), generation_config(spec))
+        extracted = parse_answer(content, spec)
+    except asyncio.CancelledError:
+        failure_class = CANCELLED
+        raise
+    except Exception as e:
+        failure_class = classify_failure(e)
+        raise
+    finally:
+        llm_breaker.after_call(probe, failure_class)
+        if slot is not None:
+            llm_concurrency.release(slot, failure_class)
+            record_call(spec, text, started, content, failure_class)
+
+    await asyncio.to_thread(llm_cache.put, cache_key, extracted)
+    return extracted
@@ -0,0 +1,151 @@
+import asyncio
+import contextvars
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from resources.credential_pool import credential_pool
+from resources.retry_policy import THROTTLED
+
+load_dotenv()
+
+# Number of LLM calls allowed in flight at once when a run starts
+LLM_MAX_WORKERS = int(os.getenv("LLM_MAX_WORKERS", "8"))
+# Let the in-flight limit follow the quota (AIMD) between these bounds; with it off LLM_MAX_WORKERS is a fixed limit
+LLM_ADAPTIVE_CONCURRENCY = os.getenv("LLM_ADAPTIVE_CONCURRENCY", "true").lower() == "true"
+LLM_MIN_CONCURRENCY = int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+
+ASYNC_POLL_INTERVAL = 0.05
+
+
+class AIMDLimiter:
+    """
+    Adaptive limit on in-flight LLM calls (additive increase, multiplicative decrease, as in TCP congestion control).
+
+    Every successful call raises the limit by increase / limit, i.e. by about `increase` per limit's worth of calls;
+    a throttled call (429 / RESOURCE_EXHAUSTED) multiplies it by `decrease`. Only calls started after the last cut
+    can cut again, so a burst of 429s from calls that were already in flight counts as one congestion signal.
+
+    Args:
+        initial (int): Limit at start.
+        minimum (int): Lowest limit (at least 1).
+        maximum (int): Highest limit; also the number of dispatcher threads.
+        increase (float): Additive step per limit's worth of successful calls.
+        decrease (float): Factor applied on throttling.
+        congested (function): Called on a throttled call; returning False means the 429 is handled elsewhere (e.g. by
+            routing around one throttled API key) and the limit isn't cut. None: every 429 cuts.
+    """
+
+    def __init__(self, initial, minimum, maximum, increase=1.0, decrease=0.5, congested=None):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.increase = increase
+        self.decrease = decrease
+        self.congested = congested
+        self._condition = threading.Condition()
+        self._limit = float(min(max(initial, self.minimum), self.maximum))
+        self._in_flight = 0
+        self._last_cut = 0.0
+        self._cuts = 0
+        self._peak = self._limit
+        self._low = self._limit
+
+    @property
+    def limit(self):
+        return math.floor(self._limit)
+
+    def try_acquire(self):
+        """Takes a slot only if one is free right now; returns it, or None."""
+        with self._condition:
+            if self._in_flight < self.limit:
+                self._in_flight += 1
+                return time.monotonic()
+            return None
+
+    def acquire(self):
+        """Blocks until a slot is free; returns the slot (its start time) to pass to release."""
+        with self._condition:
+            while self._in_flight >= self.limit:
+                self._condition.wait()
+            self._in_flight += 1
+            return time.monotonic()
+
+    async def acquire_async(self):
+        """Waits without blocking the event loop until a slot is free."""
+        while (slot := self.try_acquire()) is None:
+            await asyncio.sleep(ASYNC_POLL_INTERVAL)
+        return slot
+
+    def release(self, slot, failure_class=None):
+        """
+        Frees the slot and adapts the limit to the call's outcome.
+
+        Args:
+            slot (float): Value returned by acquire.
+            failure_class (str): None for a successful call, else its class from classify_failure (or CANCELLED for
+                a call that was dropped unanswered). Only THROTTLED lowers the limit; other failures leave it
+                unchanged.
+        """
+        # Asked before taking the lock; the backend has already reported the call to the credential pool
+        congested = failure_class == THROTTLED and (self.congested is None or self.congested())
+        with self._condition:
+            self._in_flight -= 1
+            if failure_class is None:
+                self._limit = min(self.maximum, self._limit + self.increase / self._limit)
+                self._peak = max(self._peak, self._limit)
+            elif congested and slot >= self._last_cut:
+                self._limit = max(self.minimum, self._limit * self.decrease)
+                self._last_cut = time.monotonic()
+                self._cuts += 1
+                self._low = min(self._low, self._limit)
+            self._condition.notify_all()
+
+    def stats(self):
+        with self._condition:
+            return {"limit": self.limit, "in_flight": self._in_flight, "peak": math.floor(self._peak),
+                    "low": math.floor(self._low), "cuts": self._cuts}
+
+    def reset_stats(self):
+        with self._condition:
+            self._cuts = 0
+            self._peak = self._low = self._limit
+
+
+if LLM_ADAPTIVE_CONCURRENCY:
+    # A 429 on one pooled API key moves its calls to the other keys; the limit is only cut once none has quota left
+    llm_concurrency = AIMDLimiter(LLM_MAX_WORKERS, LLM_MIN_CONCURRENCY, LLM_MAX_CONCURRENCY,
+                                  congested=credential_pool.throttled_everywhere)
+else:
+    llm_concurrency = AIMDLimiter(LLM_MAX_WORKERS, LLM_MAX_WORKERS, LLM_MAX_WORKERS)
+
+
+def dispatch(func, items, max_workers=None):
+    """
+    Runs func over every item on a bounded thread pool.
+
+    The pool has one thread per slot the concurrency limiter can grant; how many of them are actually calling the
+    LLM at a time is decided by llm_concurrency.
+
+    Args:
+        func (function): Function applied to each item (usually one transcript row).
+        items (iterable): Items to process.
+        max_workers (int): Upper bound on concurrent calls (default: llm_concurrency.maximum).
+
+    Returns:
+        list: Results of func, in the same order as items.
+    """
+    items = list(items)
+    workers = min(max_workers or llm_concurrency.maximum, len(items))
+
+    if workers <= 1:
+        return [func(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm-dispatch") as executor:
+        # Pool threads don't inherit the caller's context variables (e.g. the context cache run), so pass them on
+        futures = [executor.submit(contextvars.copy_context().run, func, item) for item in items]
+        return [future.result() for future in futures]
@@ -0,0 +1,165 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+from dotenv import load_dotenv
+
+from resources.llm_run import PerRun
+
+load_dotenv()
+
+# Optional JSON-lines file that gets one snapshot of the metrics appended at the end of every run
+LLM_METRICS_PATH = os.getenv("LLM_METRICS_PATH", "")
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list (0.0 for an empty one)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class ParameterMetrics:
+    """Counters of one parameter's LLM calls."""
+
+    def __init__(self):
+        self.latencies = []
+        self.calls = 0
+        self.cache_hits = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.retries = Counter()
+        self.errors = Counter()
+
+    def snapshot(self):
+        return {
+            "calls": self.calls,
+            "cache_hits": self.cache_hits,
+            "failed_calls": sum(self.errors.values()),
+            "latency_seconds": {f"p{pct}": round(percentile(self.latencies, pct), 3) for pct in PERCENTILES},
+            "total_latency_seconds": round(sum(self.latencies), 3),
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "retries": dict(self.retries),
+            "errors": dict(self.errors),
+        }
+
+
+class RunMetrics:
+    """Per-parameter counters of one run."""
+
+    def __init__(self):
+        self.parameters = defaultdict(ParameterMetrics)
+        self.started = time.monotonic()
+
+
+class LLMMetrics:
+    """
+    Per-parameter instrumentation of the LLM calls of a run: latency percentiles, estimated input/output tokens,
+    response cache hits, retries and failed calls by failure class (see resources/retry_policy.py).
+
+    Counters are kept per run (resources/llm_run.py), so concurrent runs in one process report their own calls.
+    Latencies cover the backend call and answer parsing, not the wait for the rate limiter. Process-wide values
+    owned by other components (e.g. the current concurrency limit) are registered as gauges.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._runs = PerRun(RunMetrics)
+        self._gauges = {}
+
+    def register_gauge(self, name, read, reset=None):
+        """
+        Adds a run-level gauge to summaries and written snapshots.
+
+        Args:
+            name (str): Gauge name.
+            read (function): Returns the gauge's current values as a dict.
+            reset (function): Called when a run ends and no other run is in progress, or None.
+        """
+        self._gauges[name] = (read, reset)
+
+    def record_call(self, parameter, latency, input_tokens, output_tokens=0, failure_class=None):
+        """Records one call that reached the LLM; failure_class is None for a usable answer."""
+        with self._lock:
+            metrics = self._runs.current().parameters[parameter]
+            metrics.calls += 1
+            metrics.latencies.append(latency)
+            metrics.input_tokens += input_tokens
+            metrics.output_tokens += output_tokens
+            if failure_class is not None:
+                metrics.errors[failure_class] += 1
+
+    def record_cache_hit(self, parameter):
+        with self._lock:
+            self._runs.current().parameters[parameter].cache_hits += 1
+
+    def record_retry(self, parameter, failure_class):
+        with self._lock:
+            self._runs.current().parameters[parameter].retries[failure_class] += 1
+
+    def start_run(self):
+        """Starts the current run's counters (and its duration) now rather than at its first call."""
+        self._runs.current()
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: Parameter name -> metrics dict of the current run (calls, cache_hits, failed_calls,
+            latency_seconds percentiles, total_latency_seconds, input_tokens, output_tokens, retries and errors by
+            failure class).
+        """
+        run_metrics = self._runs.current()
+        with self._lock:
+            return {parameter: metrics.snapshot() for parameter, metrics in run_metrics.parameters.items()}
+
+    def gauges(self):
+        """Returns gauge name -> current values."""
+        return {name: read() for name, (read, _) in self._gauges.items()}
+
+    def summary(self):
+        """One line per parameter, most expensive (total LLM time) first."""
+        parameters = sorted(self.snapshot().items(), key=lambda item: -item[1]["total_latency_seconds"])
+        lines = ["LLM metrics per parameter:" if parameters else "LLM metrics: no calls"]
+        for parameter, metrics in parameters:
+            latency = ", ".join(f"{name} {value:.2f}s" for name, value in metrics["latency_seconds"].items())
+            lines.append(f"  {parameter}: {metrics['calls']} calls ({metrics['cache_hits']} cached), {latency}, "
+                         f"{metrics['input_tokens']} in / {metrics['output_tokens']} out tokens, "
+                         f"retries {metrics['retries'] or 0}, errors {metrics['errors'] or 0}")
+        for name, values in self.gauges().items():
+            lines.append(f"  {name}: " + ", ".join(f"{key}={value}" for key, value in values.items()))
+        return "\n".join(lines)
+
+    def write(self, path=LLM_METRICS_PATH):
+        """Appends the run's snapshot to the JSON-lines file at path (no-op if path is empty)."""
+        if not path:
+            return
+        entry = {"finished_at": time.time(),
+                 "duration_seconds": round(time.monotonic() - self._runs.current().started, 3),
+                 "parameters": self.snapshot(), "gauges": self.gauges()}
+        with open(path, "a", encoding="utf-8") as metrics_file:
+            metrics_file.write(json.dumps(entry) + "\n")
+
+    def reset(self):
+        """Ends the current run's counters; gauges are reset once no other run is in progress."""
+        self._runs.finish()
+        if any(run is not None for run in self._runs.runs()):
+            return
+        for _, reset in self._gauges.values():
+            if reset is not None:
+                reset()
+
+
+llm_metrics = LLMMetrics()
+
+
+def record_llm_retry(failure_class, *args):
+    """RetryPolicy hook: args are the retried call's (transcript, spec)."""
+    spec = args[-1] if args else None
+    llm_metrics.record_retry(getattr(spec, "name", "unknown"), failure_class)
@@ -0,0 +1,49 @@
+import contextvars
+import itertools
+import threading
+
+# Run that LLM calls made in the current context belong to (None outside start_run). Pool threads and tasks started
+# by a run inherit it (see llm_dispatcher.dispatch and stage_graph.run_stage_graph).
+current_run = contextvars.ContextVar("llm_run", default=None)
+_run_ids = itertools.count(1)
+
+
+def start_run():
+    """
+    Starts a run in the current context, so several runs in one process (e.g. concurrent API requests) keep their
+    metrics and cached contexts apart.
+
+    Returns:
+        int: The run's id.
+    """
+    run = next(_run_ids)
+    current_run.set(run)
+    return run
+
+
+class PerRun:
+    """Keeps one factory() value per run, so concurrent runs neither share nor reset each other's counters."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def current(self):
+        """The current run's value, created on first use."""
+        run = current_run.get()
+        with self._lock:
+            if run not in self._values:
+                self._values[run] = self._factory()
+            return self._values[run]
+
+    def finish(self):
+        """Removes the current run's value and returns it (a fresh one if the run recorded nothing)."""
+        with self._lock:
+            value = self._values.pop(current_run.get(), None)
+        return value if value is not None else self._factory()
+
+    def runs(self):
+        """Runs that currently hold a value."""
+        with self._lock:
+            return list(self._values)
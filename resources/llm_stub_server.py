@@ -0,0 +1,115 @@
+"""
+Local stand-in for the Gemini API, used with LLM_BACKEND=stub to benchmark and load-test the pipeline offline.
+
+Run it next to the pipeline:
+
+    python -m resources.llm_stub_server --port 8765 --latency-ms 800 --jitter-ms 400 --throttle-rate 0.02
+
+Every POST /generate answers with a canned JSON document that satisfies the response schema sent with the request,
+after a random delay. A configurable share of requests fails with 429 (quota) or 500 (long context) errors, so the
+retry and chunking paths are exercised too.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+VERDICT = "Met"
+TEXT = "Stub answer."
+
+
+def canned_value(key, schema):
+    kind = (schema or {}).get("type")
+    if kind == "OBJECT":
+        return {name: canned_value(name, sub_schema) for name, sub_schema in schema.get("properties", {}).items()}
+    if kind == "ARRAY":
+        return [canned_value(key, schema.get("items"))]
+    if any(word in key.lower() for word in ("evidence", "summary", "reason", "issue", "suggestion")):
+        return TEXT
+    return VERDICT
+
+
+def canned_answer(response_schema):
+    """Schema-valid answer: verdict-like keys get "Met", free-text keys a fixed sentence."""
+    if not response_schema:
+        return "```json\n{}\n```"
+    return json.dumps(canned_value("", response_schema))
+
+
+class StubStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {200: 0, 429: 0, 500: 0}
+
+    def record(self, status):
+        with self._lock:
+            self.counts[status] = self.counts.get(status, 0) + 1
+
+
+def make_handler(latency_ms, jitter_ms, throttle_rate, error_rate, stats):
+
+    class StubHandler(BaseHTTPRequestHandler):
+
+        def _reply(self, status, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            stats.record(status)
+
+        def do_POST(self):
+            if self.path != "/generate":
+                self._reply(404, {"error": "not found"})
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+
+            time.sleep(max(0.0, random.uniform(latency_ms - jitter_ms, latency_ms + jitter_ms)) / 1000)
+
+            roll = random.random()
+            if roll < throttle_rate:
+                self._reply(429, {"error": "429 Resource has been exhausted (e.g. check quota)."})
+            elif roll < throttle_rate + error_rate:
+                self._reply(500, {"error": "500 An internal error has occurred. Your input context is too long."})
+            else:
+                self._reply(200, {"model": request.get("model"),
+                                  "content": canned_answer(request.get("response_schema"))})
+
+        def do_GET(self):
+            self._reply(200, {"responses": stats.counts})
+
+        def log_message(self, format, *args):
+            pass  # One line per request would drown the benchmark output
+
+    return StubHandler
+
+
+def serve(host="127.0.0.1", port=8765, latency_ms=800.0, jitter_ms=400.0, throttle_rate=0.0, error_rate=0.0):
+    stats = StubStats()
+    server = ThreadingHTTPServer((host, port),
+                                 make_handler(latency_ms, jitter_ms, throttle_rate, error_rate, stats))
+    print(f"LLM stub listening on http://{host}:{port}/generate "
+          f"(latency {latency_ms}±{jitter_ms} ms, 429 rate {throttle_rate}, 500 rate {error_rate})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Responses by status: {stats.counts}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Gemini stand-in for offline load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=800.0)
+    parser.add_argument("--jitter-ms", type=float, default=400.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 500")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.latency_ms, args.jitter_ms, args.throttle_rate, args.error_rate)
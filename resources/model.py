@@ -1,9 +1,123 @@
 from dotenv import load_dotenv
 import os
-from langchain_google_genai import ChatGoogleGenerativeAI
-from sentence_transformers import SentenceTransformer
+import threading
+from functools import partial
+
+from resources.credential_pool import credential_pool
 
 load_dotenv()
 
-llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash", google_api_key=os.getenv("GEMINI_API"))
-timely_closing_ST_model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
+GEMINI_MODEL = "gemini-1.5-flash"
+SENTENCE_MODEL = 'paraphrase-multilingual-MiniLM-L12-v2'
+
+# Transcript routing table: (route, model, largest prompt in tokens it takes), smallest first. Prompts larger than
+# the last route go to the chunked (map-reduce) path instead. Both routes use GEMINI_MODEL unless GEMINI_SHORT_MODEL /
+# GEMINI_LONG_MODEL say otherwise (e.g. GEMINI_SHORT_MODEL=gemini-1.5-flash-8b for a smaller model on short prompts).
+CHUNKED_ROUTE = "chunked"
+LLM_ROUTES = (
+    ("short", os.getenv("GEMINI_SHORT_MODEL", GEMINI_MODEL),
+     int(os.getenv("GEMINI_SHORT_MAX_TOKENS", "8000"))),
+    ("long", os.getenv("GEMINI_LONG_MODEL", GEMINI_MODEL),
+     int(os.getenv("GEMINI_LONG_MAX_TOKENS", "200000"))),
+)
+
+
+class LazyModel:
+    """Thread-safe handle that builds its model on first use, so importing this module costs nothing."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._model = None
+
+    def get(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._factory()
+        return self._model
+
+
+def gemini_client(model, api_key):
+    """
+    New Gemini chat client. LangChain's own retries are off: RetryPolicy (resources/retry_policy.py) is the only
+    retry layer, so the limiter, breaker and hedging see every 429 and 5xx.
+    """
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(model=model, google_api_key=api_key, max_retries=0)
+
+
+def _sentence_model():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(SENTENCE_MODEL)
+
+
+ROUTE_MODELS = {route: model for route, model, _ in LLM_ROUTES}
+
+# One lazily built Gemini client per (model, API key of the credential pool)
+_gemini_clients = {}
+_gemini_clients_lock = threading.Lock()
+_sentence_model_handle = LazyModel(_sentence_model)
+
+
+def _gemini_handle(model, api_key):
+    with _gemini_clients_lock:
+        if (model, api_key) not in _gemini_clients:
+            _gemini_clients[(model, api_key)] = LazyModel(partial(gemini_client, model, api_key))
+        return _gemini_clients[(model, api_key)]
+
+
+def get_llm(api_key=None):
+    """Default Gemini client, for api_key (default: the pool's first key)."""
+    return _gemini_handle(GEMINI_MODEL, api_key or credential_pool.api_keys[0]).get()
+
+
+def get_route_llm(route, api_key=None):
+    """Gemini client of a route in the routing table, for api_key (default: the pool's first key)."""
+    return _gemini_handle(ROUTE_MODELS[route], api_key or credential_pool.api_keys[0]).get()
+
+
+def get_sentence_model():
+    """SentenceTransformer used by timely closing; loaded by the first process that needs it."""
+    return _sentence_model_handle.get()
+
+
+def cos_sim(a, b):
+    from sentence_transformers import util
+    return util.pytorch_cos_sim(a, b)
+
+
+def route_for(tokens):
+    """Returns the route name for a prompt of `tokens` tokens (CHUNKED_ROUTE if no model takes it)."""
+    for route, _, max_tokens in LLM_ROUTES:
+        if tokens <= max_tokens:
+            return route
+    return CHUNKED_ROUTE
+
+
+def warm_up(models=("llm",)):
+    """
+    Builds models up front (e.g. when a worker starts) so the first request doesn't pay for it.
+
+    Args:
+        models (iterable): Any of "llm" (the Gemini client of every route for every pooled key) and "sentence"
+            (timely closing SentenceTransformer).
+    """
+    for name in models:
+        if name == "llm":
+            for api_key in credential_pool.api_keys:
+                for route in ROUTE_MODELS:
+                    get_route_llm(route, api_key)
+        elif name == "sentence":
+            get_sentence_model()
+        else:
+            raise ValueError(f"Unknown model '{name}' (expected 'llm' or 'sentence')")
+
+
+def __getattr__(name):
+    # Keeps `from resources.model import llm` (and friends) working without loading anything at import time
+    if name == "llm":
+        return get_llm()
+    if name == "timely_closing_ST_model":
+        return get_sentence_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
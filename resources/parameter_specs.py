@@ -0,0 +1,425 @@
+import json
+import os
+from dataclasses import dataclass, field
+from functools import cached_property
+
+from resources.prompts import (RudeSarcastic_prompt, escalation_prompt, Supervisor_prompt, prompt_closing,
+                               prompt_opening, Empathy_apology_prompt, reassurance_prompt,
+                               Unethical_Solicitation_prompt, voice_of_customer_prompt, prompt_opening_lang,
+                               timely_closing_prompt, prompt_Personalization, DSAT_prompt, fused_prompt_intro,
+                               fused_prompt_output_format)
+from resources.keyword_screen import compile_keyword_matcher, keyword_screen
+from resources.phrases import escalation_keywords_en, escalation_keywords_hi
+from resources.result_extractor_cleaner import clean_text
+from resources.retry_policy import classify_failure, LONG_TRANSCRIPT
+
+# Skip the escalation LLM call for transcripts without any escalation keyword
+ESCALATION_PRESCREEN = os.getenv("ESCALATION_PRESCREEN", "true").lower() == "true"
+
+LONG_TRANSCRIPT_MESSAGE = "An unexpected error occurred on Google's side. Your input context is too long."
+
+# When merging answers for windows of one transcript, a verdict seen in any window beats the ones after it
+VERDICT_PRIORITY = ("Not Met", "Met", "Yes", "No", "N/A", "NA")
+EVIDENCE_SEPARATOR = " | "
+
+
+def merge_verdicts(values):
+    """Returns the winning verdict, or None if any value isn't a known verdict."""
+    values = [str(value).strip() for value in values]
+    if not values or any(value not in VERDICT_PRIORITY for value in values):
+        return None
+    return min(values, key=VERDICT_PRIORITY.index)
+
+
+def merge_evidence(values):
+    """Concatenates the distinct, non-empty evidence strings of all windows."""
+    seen = []
+    for value in values:
+        value = clean_text(value).strip()
+        if value and value not in ("N/A", "NA") and value not in seen:
+            seen.append(value)
+    return EVIDENCE_SEPARATOR.join(seen) if seen else "N/A"
+
+
+@dataclass(frozen=True)
+class ParameterSpec:
+    """
+    Describes one LLM-backed parameter.
+
+    Attributes:
+        name (str): Display name used in status messages.
+        prompt (str): Prompt appended after the transcript.
+        fields (dict): Output column -> key in the model's JSON answer.
+        passthrough (tuple): Input row columns copied unchanged into every result row.
+        prescreen (function): Optional transcript -> bool check; transcripts for which it returns False are not sent
+            to the LLM and get prescreen_answer instead.
+        prescreen_answer (dict): Answer (response key -> value) used for screened-out transcripts.
+    """
+    name: str
+    prompt: str
+    fields: dict
+    passthrough: tuple = field(default=())
+    prescreen: object = field(default=None)
+    prescreen_answer: dict = field(default=None)
+
+    @property
+    def columns(self):
+        return list(self.fields)
+
+    @property
+    def response_schema(self):
+        """Structured-output schema: every answer key is a required string."""
+        keys = list(dict.fromkeys(self.fields.values()))
+        return {"type": "OBJECT", "properties": {key: {"type": "STRING"} for key in keys}, "required": keys}
+
+    def validate(self, extracted):
+        """Raises ValueError if the answer can't be turned into a result row."""
+        if not isinstance(extracted, dict):
+            raise ValueError(f"{self.name}: expected a JSON object, got {type(extracted).__name__}")
+
+    def merge_answers(self, answers):
+        """
+        Reduces the answers for several windows of one transcript into a single answer.
+
+        Verdict keys (Met/Not Met, Yes/No) take the strongest verdict, so "Not Met" anywhere wins; evidence keys are
+        concatenated; any other key is taken from the first window whose verdict matches the merged one.
+        """
+        keys = list(dict.fromkeys(self.fields.values()))
+        merged, verdict_key = {}, None
+        for key in keys:
+            values = [answer.get(key, 'N/A') for answer in answers]
+            if "evidence" in key.lower():
+                merged[key] = merge_evidence(values)
+            elif (verdict := merge_verdicts(values)) is not None:
+                merged[key] = verdict
+                verdict_key = verdict_key or key
+
+        deciding = next((answer for answer in answers
+                         if verdict_key is None or str(answer.get(verdict_key, '')).strip() == merged[verdict_key]),
+                        answers[0])
+        return {key: merged[key] if key in merged else deciding.get(key, 'N/A') for key in keys}
+
+    def result_row(self, row, extracted):
+        result = {'request_id': row.get("request_id")}
+        result.update({col: row.get(col, "") for col in self.passthrough})
+        result.update({col: clean_text(extracted.get(key, 'N/A')) for col, key in self.fields.items()})
+        return result
+
+    def error_row(self, row, error):
+        if classify_failure(error) == LONG_TRANSCRIPT:
+            status, detail = "Error 500", LONG_TRANSCRIPT_MESSAGE
+        else:
+            status, detail = "Error", str(error)
+
+        result = {'request_id': row.get("request_id")}
+        result.update({col: row.get(col, "") for col in self.passthrough})
+        for position, col in enumerate(self.fields):
+            result[col] = status if position == 0 else detail
+        return result
+
+
+@dataclass(frozen=True)
+class FusedParameterSpec:
+    """
+    Several parameters asked in one LLM call against the same transcript.
+
+    Exposes the same interface as ParameterSpec, so it can be passed anywhere a single parameter can. The answer
+    holds one JSON object per section; split() turns the combined result frame back into per-parameter frames.
+
+    Attributes:
+        name (str): Display name used in status messages.
+        sections (dict): JSON section key -> ParameterSpec.
+    """
+    name: str
+    sections: dict
+    prescreen = None  # A fused call always needs the LLM for its other sections
+
+    @cached_property
+    def prompt(self):
+        parts = [fused_prompt_intro]
+        for key, spec in self.sections.items():
+            section_prompt = spec.prompt.rstrip()
+            if section_prompt.count("```") % 2:
+                section_prompt += "\n```"  # Close dangling code fences so they don't swallow the next section
+            parts.append(f'### Parameter "{key}" ({spec.name})\n{section_prompt}')
+        output_keys = {key: {response_key: "..." for response_key in spec.fields.values()}
+                       for key, spec in self.sections.items()}
+        parts.append(fused_prompt_output_format.format(sections=json.dumps(output_keys, indent=4)))
+        return "\n\n".join(parts)
+
+    @property
+    def fields(self):
+        return {col: key for spec in self.sections.values() for col, key in spec.fields.items()}
+
+    @property
+    def columns(self):
+        return list(self.fields)
+
+    @property
+    def response_schema(self):
+        return {"type": "OBJECT",
+                "properties": {key: spec.response_schema for key, spec in self.sections.items()},
+                "required": list(self.sections)}
+
+    def validate(self, extracted):
+        """Raises ValueError if the answer can't be turned into a result row."""
+        if not isinstance(extracted, dict):
+            raise ValueError(f"{self.name}: expected a JSON object, got {type(extracted).__name__}")
+        for key, spec in self.sections.items():
+            if not isinstance(extracted.get(key), dict):
+                raise ValueError(f"Fused answer is missing the '{key}' section")
+            spec.validate(extracted[key])
+
+    def merge_answers(self, answers):
+        return {key: spec.merge_answers([answer[key] for answer in answers]) for key, spec in self.sections.items()}
+
+    def result_row(self, row, extracted):
+        result = {}
+        for key, spec in self.sections.items():
+            result.update(spec.result_row(row, extracted[key]))
+        return result
+
+    def error_row(self, row, error):
+        result = {}
+        for spec in self.sections.values():
+            result.update(spec.error_row(row, error))
+        return result
+
+    def split(self, res_df):
+        """Splits a combined result frame into one frame per section, in section order."""
+        if res_df is None:
+            return [None] * len(self.sections)
+        return [res_df[['request_id'] + spec.columns].copy() for spec in self.sections.values()]
+
+
+RUDE_SARCASTIC = ParameterSpec(
+    name="Rude and Sarcastic",
+    prompt=RudeSarcastic_prompt,
+    fields={
+        'Sarcasm_rude_behaviour': 'Sarcasm_rude_behaviour',
+        'Sarcasm_rude_behaviour_evidence': 'Sarcasm_rude_behaviour_evidence'
+    })
+
+ESCALATION_KEYWORD_SCREEN = keyword_screen(compile_keyword_matcher(escalation_keywords_en, escalation_keywords_hi)) \
+    if ESCALATION_PRESCREEN else None
+
+ESCALATION = ParameterSpec(
+    name="Escalation",
+    prompt=escalation_prompt,
+    fields={
+        'escalation_results': 'Value',
+        'Issue_Identification': 'Issue',
+        'Probable_Reason_for_Escalation': 'Reason',
+        'Probable_Reason_for_Escalation_Evidence': 'Evidence',
+        'Agent_Handling_Capability': 'Agent Handling Capability',
+        'Escalation_Category': 'Escalation Category',
+        'Escalation_Keyword': 'Escalation Keyword',
+        'Short_Escalation_Reason': 'Short Escalation Reason'
+    },
+    # No keyword -> "Met", with the same N/A filling build_brcp_output applies to every "Met" escalation
+    prescreen=ESCALATION_KEYWORD_SCREEN,
+    prescreen_answer={'Value': 'Met', 'Issue': 'N/A', 'Reason': 'N/A', 'Evidence': 'N/A',
+                      'Agent Handling Capability': 'N/A', 'Escalation Category': 'N/A', 'Escalation Keyword': 'N/A',
+                      'Short Escalation Reason': 'N/A'})
+
+SUPERVISOR = ParameterSpec(
+    name="Supervisor Connect",
+    prompt=Supervisor_prompt,
+    fields={
+        'Wanted_to_connect_with_supervisor': 'Wanted_to_connect_with_supervisor',
+        'de_escalate': 'de_escalate',
+        'Supervisor_call_connected': 'Supervisor_call_connected',
+        'call_back_arranged_from_supervisor': 'call_back_arranged_from_supervisor',
+        'supervisor_evidence': 'supervisor_evidence',
+        'Denied_for_Supervisor_call': 'Denied_for_Supervisor_call',
+        'denied_evidence': 'denied_evidence'
+    })
+
+APOLOGY_EMPATHY = ParameterSpec(
+    name="Apology and Empathy",
+    prompt=Empathy_apology_prompt,
+    fields={
+        'Apology_result': 'Apology',
+        'Apology_evidence': 'Apology Evidence',
+        'Empathy_result': 'Empathy',
+        'Empathy_evidence': 'Empathy Evidence',
+        'Apology_Category': 'Apology Category',
+        'Empathy_Category': 'Empathy Category'
+    })
+
+UNETHICAL_SOLICITATION = ParameterSpec(
+    name="Unethical Solicitation",
+    prompt=Unethical_Solicitation_prompt,
+    fields={
+        'Unethical_Solicitation': 'Unethical_Solicitation',
+        'Unethical_Solicitation_Evidence': 'Unethical_Solicitation_Evidence'
+    })
+
+REASSURANCE = ParameterSpec(
+    name="Reassurance",
+    prompt=reassurance_prompt,
+    fields={
+        'Reassurance_result': 'Value',
+        'Reassurance_evidence': 'Evidence',
+        'Reassurance_Category': 'Category'
+    })
+
+CHAT_CLOSING = ParameterSpec(
+    name="Chat Closing",
+    prompt=prompt_closing,
+    fields={
+        'Further Assistance': 'Further Assistance',
+        'Further Assistance Evidence': 'Further Assistance Evidence',
+        'Effective IVR Survey': 'Effective IVR Survey',
+        'Effective IVR Survey Evidence': 'Effective IVR Survey Evidence',
+        'Branding': 'Branding',
+        'Branding Evidence': 'Branding Evidence',
+        'Greeting': 'Greeting',
+        'Greeting Evidence': 'Greeting Evidence'
+    })
+
+CHAT_OPENING = ParameterSpec(
+    name="Chat Opening",
+    prompt=prompt_opening,
+    fields={
+        'Greeting_the_customer': 'Greeting the Customer',
+        'Greeting_the_customer_evidence': 'Greeting the Customer Evidence',
+        'Self_introduction': 'Self Introduction',
+        'Self_introduction_evidence': 'Self Introduction Evidence',
+        'Identity_confirmation': 'Customer Identity Confirmation',
+        'Identity_confirmation_evidence': 'Customer Identity Confirmation Evidence'
+    })
+
+DSAT = ParameterSpec(
+    name="DSAT",
+    prompt=DSAT_prompt,
+    fields={
+        'Customer_Issue_Identification': 'Customer_Issue_Identification',
+        'Reason_for_DSAT': 'Reason_for_DSAT',
+        'Suggestion_for_DSAT_Prevention': 'Suggestion_for_DSAT_Prevention'
+    })
+
+VOICE_OF_CUSTOMER = ParameterSpec(
+    name="Voice Of Customer",
+    prompt=voice_of_customer_prompt,
+    fields={
+        'VOC_Category': 'Category',
+        'VOC_Core_Issue_Summary': 'Core_Issue_Summary'
+    })
+
+OPENING_LANGUAGE = ParameterSpec(
+    name="Open the call in default language",
+    prompt=prompt_opening_lang,
+    fields={
+        'Open the call in default language': 'default_opening_lang',
+        'Open the call in default language evidence': 'Evidence',
+        'Open the call in default language Reason': 'Reason'
+    })
+
+TIMELY_CLOSING = ParameterSpec(
+    name="Timely Closing",
+    prompt=timely_closing_prompt,
+    fields={
+        'Category': 'Category',
+        'Summary': 'Summary',
+        'Supporting_Evidence': 'Supporting_Evidence'
+    },
+    passthrough=('transcript',))
+
+PERSONALIZATION = ParameterSpec(
+    name="Personalization",
+    prompt=prompt_Personalization,
+    fields={
+        'Personalization_result': 'Personalization_result',
+        'Personalization_Evidence': 'Personalization_Evidence'
+    })
+
+BRCP_FUSED = FusedParameterSpec(
+    name="BRCP (Rude/Sarcasm, Escalation, Supervisor)",
+    sections={
+        'rude_sarcasm': RUDE_SARCASTIC,
+        'escalation': ESCALATION,
+        'supervisor': SUPERVISOR
+    })
+
+# Softskill parameters that only need the transcript, in output order
+SOFTSKILL_TRANSCRIPT_SPECS = (APOLOGY_EMPATHY, UNETHICAL_SOLICITATION, REASSURANCE, CHAT_CLOSING, CHAT_OPENING,
+                              VOICE_OF_CUSTOMER, OPENING_LANGUAGE, PERSONALIZATION)
+
+# The same parameters grouped so each group is one LLM call per transcript
+SOFTSKILL_CONDUCT_FUSED = FusedParameterSpec(
+    name="Softskill conduct (Apology/Empathy, Reassurance, VOC, Personalization)",
+    sections={
+        'apology_empathy': APOLOGY_EMPATHY,
+        'reassurance': REASSURANCE,
+        'voice_of_customer': VOICE_OF_CUSTOMER,
+        'personalization': PERSONALIZATION
+    })
+
+SOFTSKILL_OPENING_CLOSING_FUSED = FusedParameterSpec(
+    name="Softskill opening & closing (Opening, Opening Language, Closing, Unethical Solicitation)",
+    sections={
+        'chat_opening': CHAT_OPENING,
+        'opening_language': OPENING_LANGUAGE,
+        'chat_closing': CHAT_CLOSING,
+        'unethical_solicitation': UNETHICAL_SOLICITATION
+    })
+
+
+@dataclass(frozen=True)
+class SkipRule:
+    """
+    Declares that post-processing discards one parameter's answer depending on another parameter's result.
+
+    The source parameter has to be classified first; rows where its column holds one of `values` then get
+    skipped_answer for the target parameter instead of an LLM call.
+
+    Attributes:
+        target (str): Name of the parameter whose answer gets discarded.
+        source (str): Name of the parameter that decides it.
+        column (str): Column of the source result frame to look at.
+        values (tuple): Source values for which the target's answer is discarded.
+        skipped_answer (dict): Answer (response key -> value) the target row gets instead.
+        reason (str): Which post-processing step discards the answer.
+    """
+    target: str
+    source: str
+    column: str
+    values: tuple
+    skipped_answer: dict
+    reason: str
+
+    def preset_answers(self, source_res_df):
+        """request_id -> skipped_answer for every row of the source result that prunes the target."""
+        if source_res_df is None or source_res_df.empty:
+            return {}
+        pruned = source_res_df[source_res_df[self.column].isin(self.values)]
+        return {request_id: self.skipped_answer for request_id in pruned['request_id']}
+
+
+# Answers that post-processing is guaranteed to overwrite. Rules that can't be expressed here (and why):
+# - update_closing_values only flips "Not Met" closing fields to "Met" for customer/system disconnections and keeps
+#   the LLM evidence, so the Chat Closing call is still needed for those calls.
+# - build_brcp_output blanks the supervisor detail columns when Wanted_to_connect_with_supervisor is "No", but that
+#   flag comes from the same Supervisor call.
+SKIP_RULES = (
+    SkipRule(target=UNETHICAL_SOLICITATION.name, source=CHAT_CLOSING.name, column='Effective IVR Survey',
+             values=("Not Met",),
+             skipped_answer={'Unethical_Solicitation': 'N/A', 'Unethical_Solicitation_Evidence': 'N/A'},
+             reason="updating_CRED_FINAL_OUTPUT_results nulls Unethical_Solicitation when No_Survey_Pitch "
+                    "(Effective IVR Survey) is Not Met"),
+)
+
+
+def dependency_sources(spec, rules=SKIP_RULES):
+    """Names of the parameters whose results decide which of spec's rows can be skipped."""
+    return tuple(dict.fromkeys(rule.source for rule in rules if rule.target == spec.name))
+
+
+def preset_answers_for(spec, results, rules=SKIP_RULES):
+    """Collects the pruned rows for spec from already classified parameters (results: name -> result frame)."""
+    presets = {}
+    for rule in rules:
+        if rule.target == spec.name and rule.source in results:
+            presets.update(rule.preset_answers(results[rule.source]))
+    return presets
@@ -207,3 +207,18 @@ verbiage_phrases = {
     'disconnection_verbiage_3': "As there is no response from your side, I am going ahead and disconnecting the call. "
                                 "Thank you for your time, and have a great day/evening ahead."
 }
+
+# Escalation keywords from escalation_prompt; a transcript without any of them is "Met" without asking the LLM
+escalation_keywords_en = [
+    "Kunal Shah", "CEO", "Supervisor", "Senior", "Social Media", "Twitter", "Facebook", "Instagram", "LinkedIn",
+    "YouTube", "Consumer forum", "Consumer court", "Grievance officer", "Ombudsman", "threat", "threaten",
+    "threatened", "threatening", "harassment", "harass", "harassed", "harassing", "RBI", "NPCI", "Police", "Court",
+    "Legal action", "legal notice", "Lawyer", "Advocate", "Suicide", "vakil", "adalat", "dhamki"
+]
+
+escalation_keywords_hi = [
+    "कुणाल शाह", "कुनाल शाह", "सीईओ", "सुपरवाइजर", "सुपरवाइज़र", "सीनियर", "सोशल मीडिया", "ट्विटर", "फेसबुक",
+    "कंज्यूमर फोरम", "उपभोक्ता फोरम", "उपभोक्ता अदालत", "उपभोक्ता न्यायालय", "ग्रीवेंस ऑफिसर", "शिकायत अधिकारी",
+    "धमकी", "उत्पीड़न", "आरबीआई", "एनपीसीआई", "पुलिस", "कोर्ट", "अदालत", "न्यायालय", "कानूनी कार्रवाई",
+    "लीगल एक्शन", "वकील", "एडवोकेट", "आत्महत्या", "सुसाइड"
+]
@@ -530,3 +530,16 @@ Output Format:
     "Personalization_Evidence": "<evidence from the transcript>"
 }
 """
+
+fused_prompt_intro = """
+You are a highly objective AI assistant auditing the call transcript provided above. You will evaluate the same transcript for several independent parameters in a single pass. Each parameter below has its own instructions; apply each one independently and do not let the result of one parameter influence another.
+"""
+
+fused_prompt_output_format = """
+### Combined Output Format
+Ignore the individual output formats given inside each parameter above. Return exactly one JSON object with one key per parameter, where each key holds that parameter's JSON object with exactly the keys listed:
+
+```json
+{sections}
+```
+"""
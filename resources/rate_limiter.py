@@ -0,0 +1,84 @@
+import asyncio
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from resources.credential_pool import credential_pool
+
+load_dotenv()
+
+# Gemini quota of one project (API key); the limiter allows it once per key in the credential pool. Set either value
+# to 0 to disable that limit.
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "2000"))
+GEMINI_TPM = int(os.getenv("GEMINI_TPM", "4000000"))
+
+
+class TokenBucket:
+    """Classic token bucket: holds up to `capacity` tokens and refills continuously at `rate` tokens per second."""
+
+    def __init__(self, capacity, rate):
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` tokens are available (0 if they already are)."""
+        missing = amount - self.tokens
+        return max(0.0, missing / self.rate)
+
+
+class RateLimiter:
+    """
+    Process-wide requests-per-minute and tokens-per-minute limiter.
+
+    A call is admitted only when both buckets can pay for it, so bursts are smoothed to the quota instead of
+    being rejected by the API with 429s. Usable from threads (acquire) and from an event loop (acquire_async).
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self._lock = threading.Lock()
+        self._requests = TokenBucket(requests_per_minute, requests_per_minute / 60) if requests_per_minute else None
+        self._tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60) if tokens_per_minute else None
+
+    def _try_acquire(self, tokens):
+        """Takes one request and `tokens` tokens if possible; otherwise returns how long to wait."""
+        with self._lock:
+            now = time.monotonic()
+            needs = []
+            if self._requests:
+                self._requests.refill(now)
+                needs.append((self._requests, 1))
+            if self._tokens:
+                self._tokens.refill(now)
+                # A single oversized prompt can never fit; let it through on a full bucket instead of waiting forever
+                needs.append((self._tokens, min(tokens, self._tokens.capacity)))
+
+            wait = max((bucket.wait_time(amount) for bucket, amount in needs), default=0.0)
+            if wait == 0.0:
+                for bucket, amount in needs:
+                    bucket.tokens -= amount
+            return wait
+
+    def try_acquire(self, tokens=0):
+        """Takes the call's share of the quota only if it is available right now; returns whether it did."""
+        return self._try_acquire(tokens) == 0.0
+
+    def acquire(self, tokens=0):
+        """Blocks the calling thread until the call fits in the quota."""
+        while (wait := self._try_acquire(tokens)) > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens=0):
+        """Waits without blocking the event loop until the call fits in the quota."""
+        while (wait := self._try_acquire(tokens)) > 0:
+            await asyncio.sleep(wait)
+
+
+gemini_rate_limiter = RateLimiter(GEMINI_RPM * len(credential_pool), GEMINI_TPM * len(credential_pool))
@@ -13,6 +13,59 @@ def extract_json_objects(response_text):
         return f"JSON decoding error: {e}"
 
 
+def check_schema(value, schema, path="answer"):
+    """
+    Validates a parsed JSON value against a (Gemini-style) response schema.
+
+    Only the subset used by the parameter specs is supported: OBJECT with properties/required, ARRAY and STRING.
+
+    Raises:
+        ValueError: If the value doesn't match the schema.
+    """
+    expected = schema.get("type")
+    if expected == "OBJECT":
+        if not isinstance(value, dict):
+            raise ValueError(f"{path}: expected an object, got {type(value).__name__}")
+        missing = [key for key in schema.get("required", []) if key not in value]
+        if missing:
+            raise ValueError(f"{path}: missing keys {missing}")
+        for key, sub_schema in schema.get("properties", {}).items():
+            if key in value:
+                check_schema(value[key], sub_schema, f"{path}.{key}")
+    elif expected == "ARRAY":
+        if not isinstance(value, list):
+            raise ValueError(f"{path}: expected a list, got {type(value).__name__}")
+        for position, item in enumerate(value):
+            check_schema(item, schema.get("items", {}), f"{path}[{position}]")
+    elif expected == "STRING" and not isinstance(value, str):
+        raise ValueError(f"{path}: expected a string, got {type(value).__name__}")
+
+
+def extract_structured_json(response_text, schema):
+    """
+    Parses a structured-output answer (a bare JSON document) and validates it against schema.
+
+    Falls back to the ```json block scraping of extract_json_objects when the answer isn't bare JSON, e.g. when
+    structured output is switched off; scraped answers are only checked to be an object.
+
+    Raises:
+        ValueError: If no JSON object can be parsed or it doesn't match the schema.
+    """
+    try:
+        extracted = json.loads(response_text)
+    except json.JSONDecodeError:
+        found = extract_json_objects(response_text)
+        if not isinstance(found, list) or not found:
+            raise ValueError(f"No JSON object found in the answer: {found or response_text[:200]!r}")
+        extracted = found[0]
+        if not isinstance(extracted, dict):
+            raise ValueError(f"Expected a JSON object in the answer, got: {extracted!r}")
+        return extracted
+
+    check_schema(extracted, schema)
+    return extracted
+
+
 def clean_text(text):
     text = str(text)
     for prefix, suffix in [("['", "']"), ('["', '"]'), ('[', ']'), ('[{', '}]')]:
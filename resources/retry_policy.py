@@ -0,0 +1,143 @@
+import asyncio
+import json
+import os
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from dotenv import load_dotenv
+
+from resources.llm_metrics import record_llm_retry
+
+load_dotenv()
+
+THROTTLED = "throttled"
+LONG_TRANSCRIPT = "long_transcript"
+PARSE = "parse"
+TRANSIENT = "transient"
+UNAVAILABLE = "unavailable"
+# Can't succeed on retry and says nothing about the LLM's health (e.g. a prompt missing from a replayed cassette)
+FATAL = "fatal"
+# Not returned by classify_failure: a call dropped before it answered (a lost hedge, a cancelled asyncio task)
+CANCELLED = "cancelled"
+
+FATAL_TYPES = ("CassetteMissError",)
+THROTTLE_TYPES = ("ResourceExhausted", "TooManyRequests")
+SERVER_ERROR_TYPES = ("InternalServerError", "ServiceUnavailable", "BadGateway", "GatewayTimeout", "DeadlineExceeded")
+THROTTLE_MARKERS = ("resource has been exhausted", "resource_exhausted", "quota", "rate limit", "too many requests")
+LONG_TRANSCRIPT_MARKERS = ("context is too long", "exceeds the maximum number of tokens", "input token count")
+# HTTP status as API errors print it ("500 Internal error", "... returned 429 ..."); not part of a longer number
+STATUS_PATTERN = re.compile(r"(?<![\w.])([45]\d\d)(?![\w.])")
+
+
+def error_status(error):
+    """HTTP status of an API error (from its code/status_code or its message), or None."""
+    for status in (getattr(error, "code", None), getattr(error, "status_code", None),
+                   getattr(getattr(error, "response", None), "status_code", None)):
+        if isinstance(status, int):
+            return status
+    match = STATUS_PATTERN.search(str(error))
+    return int(match.group(1)) if match else None
+
+
+def classify_failure(error):
+    """
+    Buckets an LLM call failure so the retry policy can treat it appropriately.
+
+    Gemini's oversized-context error is recognised by its message first, since it comes as a 500; otherwise the
+    exception type and HTTP status decide, and only errors that say neither are matched on their message.
+
+    Returns:
+        str: UNAVAILABLE (refused by the open circuit breaker), FATAL (can't succeed on retry), PARSE (answer
+        couldn't be parsed or validated), THROTTLED (429 / quota), TRANSIENT (5xx, timeouts, dropped connections and
+        anything unrecognised) or LONG_TRANSCRIPT (Gemini's oversized-context error).
+    """
+    if type(error).__name__ == "LLMUnavailableError":
+        return UNAVAILABLE
+    if type(error).__name__ in FATAL_TYPES:
+        return FATAL
+    if isinstance(error, (ValueError, KeyError, IndexError, json.JSONDecodeError)):
+        return PARSE
+    message = str(error).lower()
+    # Gemini rejects an oversized context with a 500, so this has to win over the status/type checks below
+    if any(marker in message for marker in LONG_TRANSCRIPT_MARKERS):
+        return LONG_TRANSCRIPT
+    status = error_status(error)
+    if type(error).__name__ in THROTTLE_TYPES or status == 429:
+        return THROTTLED
+    if type(error).__name__ in SERVER_ERROR_TYPES or (status is not None and status >= 500):
+        return TRANSIENT
+    if any(marker in message for marker in THROTTLE_MARKERS):
+        return THROTTLED
+    return TRANSIENT
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Per-failure-class retry budgets with exponential backoff and full jitter.
+
+    Throttling and transient errors back off exponentially (capped at max_delay); parse errors get a small budget
+    with a short fixed pause; long transcripts and FATAL failures are never retried since resending the same prompt
+    can't succeed, and calls refused by the open circuit breaker are left to the pipeline, which pauses until the
+    LLM is back.
+
+    Attributes:
+        attempts (dict): Failure class -> number of retries allowed for one call.
+        base_delay (float): Backoff for the first retry, in seconds.
+        max_delay (float): Upper bound for any single backoff, in seconds.
+        parse_delay (float): Fixed pause before re-asking after an unparseable answer.
+        on_retry (callable): Called as on_retry(failure_class, *args) before each retry, or None.
+    """
+    attempts: dict = field(default_factory=lambda: {THROTTLED: 6, TRANSIENT: 3, PARSE: 2, LONG_TRANSCRIPT: 0,
+                                                    UNAVAILABLE: 0, FATAL: 0})
+    base_delay: float = float(os.getenv("LLM_RETRY_BASE_DELAY", "1"))
+    max_delay: float = float(os.getenv("LLM_RETRY_MAX_DELAY", "60"))
+    parse_delay: float = 0.5
+    on_retry: Optional[Callable] = None
+
+    def should_retry(self, failure_class, attempt):
+        """attempt is the number of retries already made for this call."""
+        return attempt < self.attempts.get(failure_class, 0)
+
+    def backoff(self, attempt, failure_class=TRANSIENT):
+        if failure_class == PARSE:
+            return self.parse_delay
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _notify(self, failure_class, args):
+        if self.on_retry is not None:
+            self.on_retry(failure_class, *args)
+
+    def call(self, func, *args):
+        """Calls func(*args), retrying failures according to their class; re-raises the last error."""
+        attempt = 0
+        while True:
+            try:
+                return func(*args)
+            except Exception as e:
+                failure_class = classify_failure(e)
+                if not self.should_retry(failure_class, attempt):
+                    raise
+                self._notify(failure_class, args)
+                time.sleep(self.backoff(attempt, failure_class))
+                attempt += 1
+
+    async def acall(self, func, *args):
+        """Async counterpart of call for coroutine functions."""
+        attempt = 0
+        while True:
+            try:
+                return await func(*args)
+            except Exception as e:
+                failure_class = classify_failure(e)
+                if not self.should_retry(failure_class, attempt):
+                    raise
+                self._notify(failure_class, args)
+                await asyncio.sleep(self.backoff(attempt, failure_class))
+                attempt += 1
+
+
+llm_retry_policy = RetryPolicy(on_retry=record_llm_retry)
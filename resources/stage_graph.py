@@ -0,0 +1,119 @@
+import contextvars
+import multiprocessing
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import nullcontext
+from dataclasses import dataclass
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# LLM-backed stages run on threads (they share the process-wide rate/concurrency limits). CPU-bound stages run on
+# threads too unless STAGE_CPU_WORKERS > 0 gives them that many spawned worker processes; each worker re-imports the
+# entry script, so a script that turns this on must start its run under `if __name__ == "__main__":`.
+STAGE_LLM_WORKERS = int(os.getenv("STAGE_LLM_WORKERS", "16"))
+STAGE_CPU_WORKERS = int(os.getenv("STAGE_CPU_WORKERS", "0"))
+
+LLM_STAGE = "llm"
+CPU_STAGE = "cpu"
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    One step of a stage graph.
+
+    Attributes:
+        name (str): Stage name; dependent stages refer to its result by this name.
+        func (function): Called with copies of the values named in inputs, in order, so stages running at the same
+            time never see each other's changes. CPU stages may be pickled to a worker process, so they must be
+            module-level functions (or partials of one).
+        inputs (tuple): Names of graph inputs or other stages whose results this stage needs.
+        kind (str): LLM_STAGE (thread pool) or CPU_STAGE (process pool when cpu_workers > 0).
+        status (str): Status message for the stage's completion, or None.
+    """
+    name: str
+    func: object
+    inputs: tuple = ()
+    kind: str = LLM_STAGE
+    status: str = None
+
+
+def check_graph(stages, inputs):
+    """Raises ValueError if a stage needs a value that no input or earlier stage provides, or on a cycle."""
+    known = set(inputs)
+    pending = list(stages)
+    while pending:
+        ready = [stage for stage in pending if set(stage.inputs) <= known]
+        if not ready:
+            raise ValueError(f"Stages with unknown inputs or a dependency cycle: {[stage.name for stage in pending]}")
+        known.update(stage.name for stage in ready)
+        pending = [stage for stage in pending if stage not in ready]
+
+
+def isolated(value):
+    # Stages run on threads get their own copies, as they would in a worker process
+    return value.copy() if hasattr(value, "copy") else value
+
+
+def run_stage_graph(stages, inputs, llm_workers=STAGE_LLM_WORKERS, cpu_workers=STAGE_CPU_WORKERS, on_complete=None):
+    """
+    Runs every stage as soon as the values it needs are available, so independent stages overlap and a run takes
+    about as long as its slowest dependency chain instead of the sum of all stages.
+
+    Args:
+        stages (list): Stage objects.
+        inputs (dict): Graph inputs, name -> value.
+        llm_workers (int): Threads for LLM stages.
+        cpu_workers (int): Worker processes for CPU stages (0: run them on threads).
+        on_complete (function): Called as on_complete(stage) in this process when a stage finishes.
+
+    Returns:
+        dict: Inputs and stage results, by name.
+
+    Raises:
+        Exception: The first stage failure; stages that haven't started are cancelled.
+    """
+    check_graph(stages, inputs)
+    results = dict(inputs)
+    pending = list(stages)
+    running = {}
+    started = time.monotonic()
+    stage_seconds = 0.0
+
+    process_pool = ProcessPoolExecutor(max_workers=cpu_workers, mp_context=multiprocessing.get_context("spawn")) \
+        if cpu_workers > 0 else nullcontext()
+    with ThreadPoolExecutor(max_workers=llm_workers, thread_name_prefix="stage") as threads, process_pool as processes:
+
+        def submit_ready():
+            for stage in [stage for stage in pending if all(name in results for name in stage.inputs)]:
+                args = [results[name] for name in stage.inputs]
+                if stage.kind == CPU_STAGE and processes is not None:
+                    future = processes.submit(stage.func, *args)
+                else:
+                    future = threads.submit(contextvars.copy_context().run, stage.func, *map(isolated, args))
+                running[future] = (stage, time.monotonic())
+                pending.remove(stage)
+
+        submit_ready()
+        try:
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, stage_started = running.pop(future)
+                    results[stage.name] = future.result()
+                    seconds = time.monotonic() - stage_started
+                    stage_seconds += seconds
+                    print(f"Stage '{stage.name}' done in {seconds:.1f}s")
+                    if on_complete is not None:
+                        on_complete(stage)
+                submit_ready()
+        except BaseException:
+            for future in running:
+                future.cancel()
+            raise
+
+    print(f"{len(stages)} stages done in {time.monotonic() - started:.1f}s ({stage_seconds:.1f}s summed over stages)")
+    return results
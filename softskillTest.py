@@ -1,6 +1,7 @@
 from main import get_softskill_result
 
-print(get_softskill_result())
+if __name__ == "__main__":
+    print(get_softskill_result())
 # from datetime import datetime, timedelta
 #
 # import pandas as pd
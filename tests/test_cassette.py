@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from resources import chunking, llm_client
+from resources.circuit_breaker import CircuitBreaker, CLOSED
+from resources.llm_backend import LLMBackend, CassetteBackend, CassetteMissError
+from resources.parameter_specs import RUDE_SARCASTIC
+from resources.retry_policy import classify_failure, FATAL
+
+ANSWER = json.dumps({"Sarcasm_rude_behaviour": "No", "Sarcasm_rude_behaviour_evidence": "N/A"})
+
+
+class CannedBackend(LLMBackend):
+    name = "canned"
+
+    def model_name(self, route):
+        return f"canned:{route}"
+
+    def complete(self, text, route, generation_config=None):
+        return ANSWER
+
+    async def acomplete(self, text, route, generation_config=None):
+        return ANSWER
+
+
+class CountingCassette(CassetteBackend):
+    def __init__(self, inner, path, mode):
+        super().__init__(inner, path, mode)
+        self.calls = 0
+
+    def complete(self, text, route, generation_config=None):
+        self.calls += 1
+        return super().complete(text, route, generation_config)
+
+
+@pytest.fixture
+def replayed_llm(tmp_path, monkeypatch):
+    path = str(tmp_path / "cassette.jsonl.gz")
+    recorder = CassetteBackend(CannedBackend(), path, "record")
+    recorder.complete("Agent: recorded call", "short")
+    recorder.finish_run()
+
+    cassette = CountingCassette(CannedBackend(), path, "replay")
+    breaker = CircuitBreaker(failure_threshold=3, cooldown=60)
+    monkeypatch.setattr(llm_client, "llm_backend", cassette)
+    monkeypatch.setattr(llm_client, "llm_breaker", breaker)
+    monkeypatch.setattr(llm_client, "context_cache", None)
+    monkeypatch.setattr(llm_client.llm_cache, "enabled", False)
+    return cassette, breaker
+
+
+def test_recorded_prompt_is_replayed(replayed_llm):
+    cassette, _ = replayed_llm
+    assert cassette.complete("Agent: recorded call", "short") == ANSWER
+
+
+def test_unrecorded_prompt_fails_without_retries_or_tripping_the_breaker(replayed_llm):
+    cassette, breaker = replayed_llm
+
+    for _ in range(breaker.failure_threshold + 1):
+        with pytest.raises(CassetteMissError) as raised:
+            chunking.invoke_with_chunking("Agent: never recorded", RUDE_SARCASTIC)
+        assert classify_failure(raised.value) == FATAL
+
+    assert cassette.calls == breaker.failure_threshold + 1
+    assert breaker.state == CLOSED and breaker.stats()["consecutive_failures"] == 0
@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+import pytest
+
+from resources import chunking, llm_client
+from resources.circuit_breaker import CircuitBreaker, CLOSED
+from resources.llm_backend import LLMBackend, LLMBackendError
+from resources.parameter_specs import RUDE_SARCASTIC
+
+TRANSCRIPT_LINES = 40
+RUDE_LINE = 25
+
+
+def transcript():
+    lines = [f"Agent: this is utterance number {number} of the call" for number in range(TRANSCRIPT_LINES)]
+    lines[RUDE_LINE] = "Agent: that is a stupid question, obviously"
+    return "\n".join(lines)
+
+
+class LongContextBackend(LLMBackend):
+    """Rejects the whole transcript the way Gemini rejects an oversized context; answers windows of it."""
+    name = "long_context"
+
+    def __init__(self):
+        self.windows = []
+
+    def model_name(self, route):
+        return f"long_context:{route}"
+
+    def complete(self, text, route, generation_config=None):
+        if "number 0 " in text and f"number {TRANSCRIPT_LINES - 1} " in text:
+            raise LLMBackendError("500 An internal error has occurred. Your input context is too long.")
+        self.windows.append(text)
+        rude = "stupid question" in text
+        return json.dumps({"Sarcasm_rude_behaviour": "Yes" if rude else "No",
+                           "Sarcasm_rude_behaviour_evidence": "stupid question" if rude else "N/A"})
+
+    async def acomplete(self, text, route, generation_config=None):
+        return self.complete(text, route, generation_config)
+
+
+@pytest.fixture
+def long_context_llm(monkeypatch):
+    backend = LongContextBackend()
+    breaker = CircuitBreaker(failure_threshold=3, cooldown=60)
+    monkeypatch.setattr(llm_client, "llm_backend", backend)
+    monkeypatch.setattr(llm_client, "llm_breaker", breaker)
+    monkeypatch.setattr(llm_client, "context_cache", None)
+    monkeypatch.setattr(llm_client.llm_cache, "enabled", False)
+    return backend, breaker
+
+
+def check_merged(answer, backend, breaker):
+    assert len(backend.windows) >= 2
+    assert answer == {"Sarcasm_rude_behaviour": "Yes", "Sarcasm_rude_behaviour_evidence": "stupid question"}
+    # The rejection proves Gemini is up, so it must not count towards opening the breaker
+    assert breaker.state == CLOSED and breaker.stats()["consecutive_failures"] == 0
+
+
+def test_rejected_transcript_is_classified_in_windows(long_context_llm):
+    answer = chunking.invoke_with_chunking(transcript(), RUDE_SARCASTIC)
+    check_merged(answer, *long_context_llm)
+
+
+def test_rejected_transcript_is_classified_in_windows_async(long_context_llm):
+    answer = asyncio.run(chunking.ainvoke_with_chunking(transcript(), RUDE_SARCASTIC))
+    check_merged(answer, *long_context_llm)
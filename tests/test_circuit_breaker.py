@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from resources import llm_client
+from resources.circuit_breaker import CircuitBreaker, LLMUnavailableError, OPEN, CLOSED, HALF_OPEN
+from resources.llm_backend import LLMBackend, LLMBackendError
+from resources.parameter_specs import REASSURANCE
+from resources.retry_policy import classify_failure, TRANSIENT
+
+FAILURE_THRESHOLD = 3
+
+
+class ServerErrorBackend(LLMBackend):
+    """Answers every call with a Gemini-style 500."""
+    name = "server_error"
+
+    def __init__(self):
+        self.calls = 0
+
+    def model_name(self, route):
+        return f"server_error:{route}"
+
+    def complete(self, text, route, generation_config=None):
+        self.calls += 1
+        raise LLMBackendError("500 An internal error has occurred")
+
+    async def acomplete(self, text, route, generation_config=None):
+        return self.complete(text, route, generation_config)
+
+
+@pytest.fixture
+def failing_llm(monkeypatch):
+    backend = ServerErrorBackend()
+    breaker = CircuitBreaker(failure_threshold=FAILURE_THRESHOLD, cooldown=60)
+    monkeypatch.setattr(llm_client, "llm_backend", backend)
+    monkeypatch.setattr(llm_client, "llm_breaker", breaker)
+    monkeypatch.setattr(llm_client, "context_cache", None)
+    monkeypatch.setattr(llm_client.llm_cache, "enabled", False)
+    return backend, breaker
+
+
+def test_server_errors_are_transient():
+    assert classify_failure(LLMBackendError("500 An internal error has occurred")) == TRANSIENT
+
+
+def test_consecutive_server_errors_open_the_breaker(failing_llm):
+    backend, breaker = failing_llm
+
+    for _ in range(FAILURE_THRESHOLD - 1):
+        with pytest.raises(LLMBackendError):
+            llm_client.invoke_json("Agent: Hello", REASSURANCE)
+    assert breaker.state == CLOSED
+
+    with pytest.raises(LLMBackendError):
+        llm_client.invoke_json("Agent: Hello", REASSURANCE)
+    assert breaker.state == OPEN
+
+    # Further calls fail fast without reaching the backend
+    with pytest.raises(LLMUnavailableError):
+        llm_client.invoke_json("Agent: Hello", REASSURANCE)
+    assert backend.calls == FAILURE_THRESHOLD
+
+
+def test_consecutive_server_errors_open_the_breaker_async(failing_llm):
+    backend, breaker = failing_llm
+
+    for _ in range(FAILURE_THRESHOLD):
+        with pytest.raises(LLMBackendError):
+            asyncio.run(llm_client.ainvoke_json("Agent: Hello", REASSURANCE))
+    assert breaker.state == OPEN
+
+    with pytest.raises(LLMUnavailableError):
+        asyncio.run(llm_client.ainvoke_json("Agent: Hello", REASSURANCE))
+    assert backend.calls == FAILURE_THRESHOLD
+
+
+class HangingBackend(ServerErrorBackend):
+    """Fails like ServerErrorBackend until hang is set, then never answers."""
+
+    def __init__(self):
+        super().__init__()
+        self.hang = False
+
+    async def acomplete(self, text, route, generation_config=None):
+        if self.hang:
+            await asyncio.sleep(60)
+        return self.complete(text, route, generation_config)
+
+
+def test_cancelled_probe_is_released_without_closing_the_breaker(monkeypatch):
+    backend = HangingBackend()
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=0.05)
+    monkeypatch.setattr(llm_client, "llm_backend", backend)
+    monkeypatch.setattr(llm_client, "llm_breaker", breaker)
+    monkeypatch.setattr(llm_client, "context_cache", None)
+    monkeypatch.setattr(llm_client.llm_cache, "enabled", False)
+
+    async def scenario():
+        with pytest.raises(LLMBackendError):
+            await llm_client.ainvoke_json("Agent: Hello", REASSURANCE)
+        assert breaker.state == OPEN
+        await asyncio.sleep(0.1)
+
+        backend.hang = True
+        probe = asyncio.create_task(llm_client.ainvoke_json("Agent: Hello", REASSURANCE))
+        await asyncio.sleep(0.1)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        # A cancelled probe proves nothing: the breaker stays half-open and the next call may probe straight away
+        assert breaker.state == HALF_OPEN
+        assert await asyncio.wait_for(breaker.abefore_call(), timeout=1) is True
+
+    asyncio.run(scenario())
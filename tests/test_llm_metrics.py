@@ -0,0 +1,55 @@
+import contextvars
+import threading
+
+from resources import llm_client
+from resources.llm_metrics import LLMMetrics
+from resources.llm_run import start_run
+
+
+def test_concurrent_runs_keep_their_own_metrics():
+    metrics = LLMMetrics()
+    gauge_resets = []
+    metrics.register_gauge("test", dict, lambda: gauge_resets.append(True))
+    first_started, second_finished = threading.Event(), threading.Event()
+    snapshots = {}
+
+    def first_run():
+        start_run()
+        metrics.record_call("Escalation", 1.0, 100)
+        first_started.set()
+        second_finished.wait(5)
+        snapshots["first"] = metrics.snapshot()
+        metrics.reset()
+
+    def second_run():
+        first_started.wait(5)
+        start_run()
+        metrics.record_call("Supervisor Connect", 2.0, 200)
+        metrics.record_call("Supervisor Connect", 2.0, 200)
+        snapshots["second"] = metrics.snapshot()
+        metrics.reset()
+        snapshots["gauge_resets_after_second"] = len(gauge_resets)
+        second_finished.set()
+
+    threads = [threading.Thread(target=contextvars.copy_context().run, args=(run,)) for run in (first_run, second_run)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert list(snapshots["first"]) == ["Escalation"] and snapshots["first"]["Escalation"]["calls"] == 1
+    assert list(snapshots["second"]) == ["Supervisor Connect"]
+    assert snapshots["second"]["Supervisor Connect"]["calls"] == 2
+    # Process-wide gauges are only reset when the last run in progress finishes
+    assert snapshots["gauge_resets_after_second"] == 0 and len(gauge_resets) == 1
+
+
+def test_route_counts_are_per_run():
+    def run(routes):
+        start_run()
+        for route in routes:
+            llm_client.route_counts.current().record(route)
+        return llm_client.route_counts.finish().summary()
+
+    assert "short=2" in contextvars.copy_context().run(run, ["short", "short"])
+    assert "short=0, long=1" in contextvars.copy_context().run(run, ["long"])
@@ -0,0 +1,42 @@
+import pytest
+
+from resources.llm_backend import LLMBackendError
+from resources.parameter_specs import RUDE_SARCASTIC, LONG_TRANSCRIPT_MESSAGE
+from resources.retry_policy import classify_failure, LONG_TRANSCRIPT, THROTTLED, TRANSIENT
+
+
+class InternalServerError(Exception):
+    """Stands in for google.api_core.exceptions.InternalServerError (matched by type name)."""
+
+
+LONG_CONTEXT_MESSAGE = "500 An internal error has occurred. Your input context is too long."
+
+
+@pytest.mark.parametrize("error", [
+    LLMBackendError(LONG_CONTEXT_MESSAGE),
+    InternalServerError(LONG_CONTEXT_MESSAGE),
+    Exception("400 The input token count (1200000) exceeds the maximum number of tokens allowed (1048576)."),
+])
+def test_long_context_rejections_are_long_transcript(error):
+    assert classify_failure(error) == LONG_TRANSCRIPT
+
+
+@pytest.mark.parametrize("error, expected", [
+    (LLMBackendError("500 An internal error has occurred"), TRANSIENT),
+    (InternalServerError("An internal error has occurred"), TRANSIENT),
+    (Exception("Deadline 500s exceeded"), TRANSIENT),
+    (LLMBackendError("429 Resource has been exhausted (e.g. check quota)."), THROTTLED),
+])
+def test_other_errors_keep_their_class(error, expected):
+    assert classify_failure(error) == expected
+
+
+@pytest.mark.parametrize("error, status", [
+    (LLMBackendError(LONG_CONTEXT_MESSAGE), "Error 500"),
+    (LLMBackendError("500 An internal error has occurred"), "Error"),
+    (Exception("Deadline 500s exceeded"), "Error"),
+])
+def test_error_rows_are_labelled_by_failure_class(error, status):
+    row = RUDE_SARCASTIC.error_row({"request_id": "r1"}, error)
+    assert row["Sarcasm_rude_behaviour"] == status
+    assert (row["Sarcasm_rude_behaviour_evidence"] == LONG_TRANSCRIPT_MESSAGE) == (status == "Error 500")